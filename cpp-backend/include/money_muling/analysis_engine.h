@@ -4,7 +4,7 @@
 //
 // Mirrors Python _run_analysis() in main.py:
 //   parse_csv → build_graph → detect_cycles/smurfing/shells
-//   → build_profiles → apply_filters → calculate_scores
+//   (overlapped with build_profiles → apply_filters) → calculate_scores
 //   → build_suspicious_accounts → build_fraud_rings → build_graph_data
 //
 // Spec-compliance notes:
@@ -28,8 +28,8 @@
 #include <atomic>
 #include <chrono>
 #include <future>
-#include <set>
 #include <string>
+#include <string_view>
 #include <unordered_map>
 #include <vector>
 
@@ -77,92 +77,103 @@ public:
             auto fut_cycles   = std::async(std::launch::async,
                 [&]{ return CycleDetector::detect(graph); });
             auto fut_smurfing = std::async(std::launch::async,
-                [&]{ return SmurfingDetector::detect(transactions); });
+                [&]{ return SmurfingDetector::detect(transactions, graph); });
             auto fut_shells   = std::async(std::launch::async,
                 [&]{ return ShellDetector::detect(graph); });
 
+            // ── 4. Build account profiles ────────────────────────────
+            // Profiles and filters only read the graph and transactions,
+            // so they run on this thread while the detectors are busy.
+            auto profiles = graph.build_profiles();
+
+            // ── 5. Apply false-positive filters ──────────────────────
+            Filters::apply(profiles, transactions, graph);
+
             auto cycles   = fut_cycles.get();
             auto smurfing = fut_smurfing.get();
             auto shells   = fut_shells.get();
 
-            // ── 4. Re-assign globally-unique ring IDs ────────────────
+            // ── 6. Re-assign globally-unique ring IDs ────────────────
             // Each detector uses its own counter; re-number globally so
             // RING_001 is never duplicated across cycles/smurfing/shells.
             assign_global_ring_ids(cycles, smurfing, shells);
 
-            // ── 5. Build account profiles ────────────────────────────
-            auto profiles = graph.build_profiles();
-
-            // ── 6. Apply false-positive filters ──────────────────────
-            Filters::apply(profiles, transactions);
-
             // ── 7. Calculate scores (Decision Tree) ──────────────────
             auto scores = Scoring::calculate_scores(profiles, cycles,
-                                                     smurfing, shells);
-
-            // ── 8. Build ring_map & pattern_map for graph + scoring ──
-            // ring_map:    account → [ring_ids]
-            // pattern_map: account → [raw pattern strings]
-            // spec_pattern_map: account → [spec-format pattern strings]
-            std::unordered_map<std::string, std::vector<std::string>> ring_map;
-            std::unordered_map<std::string, std::vector<std::string>> pattern_map;
-            std::unordered_map<std::string, std::set<std::string>>    spec_patterns;
-
+                                                     smurfing, shells, graph);
+
+            // ── 8. Collect per-account tags for graph + scoring ─────
+            // node_tags: node id → ring_ids, raw patterns and spec-format
+            // patterns, so each (result, account) pair costs one id lookup
+            // and the consumers index it by id instead of hashing names.
+            // Spec patterns are deduplicated as they are collected: each
+            // account's list (a handful of tags) is kept sorted, so a
+            // repeat is a binary search and never builds a std::string.
+            std::vector<NodeTags> node_tags(graph.node_count());
+            auto tags_of = [&](const std::string& acct) -> NodeTags* {
+                const int id = graph.node_id(acct);
+                return id >= 0 ? &node_tags[id] : nullptr;
+            };
+
+            // Raw patterns: a few distinct types per account, kept in
+            // first-seen order (the graph edge takes the first one)
+            auto add_raw = [](NodeTags& tags, std::string_view pat) {
+                auto& raw = tags.patterns;
+                if (std::find(raw.begin(), raw.end(), pat) == raw.end())
+                    raw.emplace_back(pat);
+            };
+            auto add_spec = [](NodeTags& tags, std::string_view pat) {
+                auto& specs = tags.detected_patterns;
+                auto pos = std::lower_bound(specs.begin(), specs.end(), pat);
+                if (pos == specs.end() || *pos != pat) specs.emplace(pos, pat);
+            };
+
+            std::string tag_buf;  // only for lengths outside the tag table
             for (const auto& c : cycles) {
                 // Spec format: "cycle_length_N"
-                std::string spec_pat = "cycle_length_" + std::to_string(c.length);
+                const std::string_view spec_pat = cycle_length_tag(c.length, tag_buf);
                 for (const auto& n : c.nodes) {
-                    ring_map[n].push_back(c.ring_id);
-                    pattern_map[n].push_back("cycle");
-                    spec_patterns[n].insert(spec_pat);
+                    auto* tags = tags_of(n);
+                    if (!tags) continue;
+                    tags->ring_ids.push_back(c.ring_id);
+                    add_raw(*tags, "cycle");
+                    add_spec(*tags, spec_pat);
                 }
             }
             for (const auto& s : smurfing) {
-                ring_map[s.account_id].push_back(s.ring_id);
-                pattern_map[s.account_id].push_back(s.pattern_type);
-                spec_patterns[s.account_id].insert(s.pattern_type); // "fan_in"/"fan_out"
-                spec_patterns[s.account_id].insert("temporal_concentration"); // window evidence
+                auto* tags = tags_of(s.account_id);
+                if (!tags) continue;
+                tags->ring_ids.push_back(s.ring_id);
+                add_raw(*tags, s.pattern_type);
+                add_spec(*tags, s.pattern_type);             // "fan_in"/"fan_out"
+                add_spec(*tags, "temporal_concentration");   // window evidence
                 if (s.velocity_per_hour > 5000.0)
-                    spec_patterns[s.account_id].insert("high_velocity");
+                    add_spec(*tags, "high_velocity");
             }
             for (const auto& s : shells) {
                 for (const auto& n : s.chain) {
-                    ring_map[n].push_back(s.ring_id);
-                    pattern_map[n].push_back("shell");
-                    spec_patterns[n].insert("layered_shell");
-                    spec_patterns[n].insert("shell"); 
+                    auto* tags = tags_of(n);
+                    if (!tags) continue;
+                    tags->ring_ids.push_back(s.ring_id);
+                    add_raw(*tags, "shell");
+                    add_spec(*tags, "layered_shell");
+                    add_spec(*tags, "shell");
                 }
             }
 
             // ── 9. Build suspicious accounts ─────────────────────────
+            // From the tags gathered above (spec-format detected_patterns
+            // included), not another walk over the detector results
             auto suspicious = Scoring::build_suspicious_accounts(
-                scores, profiles, cycles, smurfing, shells, graph);
-
-            // Inject spec-format detected_patterns into each SuspiciousAccount
-            for (auto& sa : suspicious) {
-                auto it = spec_patterns.find(sa.account_id);
-                if (it != spec_patterns.end()) {
-                    sa.detected_patterns.assign(it->second.begin(),
-                                                it->second.end());
-                }
-            }
+                scores, profiles, node_tags, graph);
 
             // ── 10. Build fraud rings ─────────────────────────────────
             auto fraud_rings = Scoring::build_fraud_rings(
                 scores, cycles, smurfing, shells);
 
             // ── 11. Build graph data for frontend ────────────────────
-            auto graph_data = graph.build_graph_data(scores, ring_map,
-                                                      pattern_map);
-
-            // Inject spec_patterns into graph nodes too
-            for (auto& gn : graph_data.nodes) {
-                auto it = spec_patterns.find(gn.id);
-                if (it != spec_patterns.end()) {
-                    gn.detected_patterns.assign(it->second.begin(),
-                                                it->second.end());
-                }
-            }
+            // (consumes node_tags, spec patterns included)
+            auto graph_data = graph.build_graph_data(scores, std::move(node_tags));
 
             // ── 12. Build summary ────────────────────────────────────
             Summary summary;
@@ -203,6 +214,22 @@ public:
     }
 
 private:
+    /**
+     * Spec tag "cycle_length_N".  Lengths are small (3..max_length), so
+     * the strings are formatted once per process and looked up by index;
+     * any other length is formatted into `buf`.
+     */
+    static std::string_view cycle_length_tag(int length, std::string& buf) {
+        static const auto tags = [] {
+            std::vector<std::string> t;
+            for (int n = 0; n <= 16; ++n) t.push_back("cycle_length_" + std::to_string(n));
+            return t;
+        }();
+        if (length >= 0 && length < (int)tags.size()) return tags[length];
+        buf = "cycle_length_" + std::to_string(length);
+        return buf;
+    }
+
     /**
      * Re-number ring IDs globally so cycles, smurfing, and shells
      * never produce duplicate RING_NNN identifiers.
@@ -213,15 +240,9 @@ private:
         std::vector<ShellResult>&    shells)
     {
         int counter = 1;
-        auto make_id = [](int n) {
-            char buf[16];
-            snprintf(buf, sizeof(buf), "RING_%03d", n);
-            return std::string(buf);
-        };
-
-        for (auto& c : cycles)   c.ring_id = make_id(counter++);
-        for (auto& s : smurfing) s.ring_id  = make_id(counter++);
-        for (auto& s : shells)   s.ring_id  = make_id(counter++);
+        for (auto& c : cycles)   c.ring_id = format_ring_id(counter++);
+        for (auto& s : smurfing) s.ring_id  = format_ring_id(counter++);
+        for (auto& s : shells)   s.ring_id  = format_ring_id(counter++);
     }
 };
 
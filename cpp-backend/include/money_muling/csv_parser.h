@@ -9,9 +9,7 @@
 #include <charconv>
 #include <chrono>
 #include <ctime>
-#include <iomanip>
-#include <sstream>
-#include <stdexcept>
+#include <optional>
 #include <string>
 #include <string_view>
 #include <vector>
@@ -22,8 +20,44 @@ namespace mm {
 
 // ─── Time parsing helpers ───────────────────────────────────────────────────
 
-inline TimePoint parse_timestamp(const std::string& s) {
+// Fixed-width "YYYY-MM-DD" / "YYYY-MM-DD(T| )HH:MM:SS" without strptime/timegm.
+// Anything else (other widths, out-of-range fields) returns nullopt and is
+// left to the strptime formats below.
+inline std::optional<TimePoint> parse_iso_fast(std::string_view s) {
+    if (s.size() != 10 && s.size() != 19) return std::nullopt;
+
+    auto digits = [&](size_t pos, size_t len, int& out) {
+        out = 0;
+        for (size_t i = pos; i < pos + len; ++i) {
+            if (s[i] < '0' || s[i] > '9') return false;
+            out = out * 10 + (s[i] - '0');
+        }
+        return true;
+    };
+
+    int y, mo, d, h = 0, mi = 0, sec = 0;
+    if (!digits(0, 4, y) || s[4] != '-' || !digits(5, 2, mo) ||
+        s[7] != '-' || !digits(8, 2, d))
+        return std::nullopt;
+    if (s.size() == 19 &&
+        ((s[10] != 'T' && s[10] != ' ') || !digits(11, 2, h) || s[13] != ':' ||
+         !digits(14, 2, mi) || s[16] != ':' || !digits(17, 2, sec)))
+        return std::nullopt;
+    // Same field ranges strptime accepts
+    if (mo < 1 || mo > 12 || d < 1 || d > 31 || h > 23 || mi > 59 || sec > 61)
+        return std::nullopt;
+
+    using namespace std::chrono;
+    // Day overflow (e.g. Feb 31) rolls into the next month, as timegm does
+    const year_month_day ymd{year{y}, month{(unsigned)mo}, day{(unsigned)d}};
+    return TimePoint(sys_days{ymd} + hours{h} + minutes{mi} + seconds{sec});
+}
+
+inline TimePoint parse_timestamp(std::string_view sv) {
+    if (auto fast = parse_iso_fast(sv)) return *fast;
+
     // Try multiple formats
+    const std::string s(sv);
     std::tm tm{};
     // ISO 8601: 2024-01-15T10:30:00
     if (auto* p = strptime(s.c_str(), "%Y-%m-%dT%H:%M:%S", &tm); p != nullptr) {
@@ -85,6 +119,51 @@ inline std::vector<std::string> split_csv_line(const std::string& line) {
     return fields;
 }
 
+inline std::string_view trim_view(std::string_view s) {
+    auto start = s.find_first_not_of(" \t\r\n");
+    if (start == std::string_view::npos) return {};
+    auto end = s.find_last_not_of(" \t\r\n");
+    return s.substr(start, end - start + 1);
+}
+
+/**
+ * Split a data row into views.  Rows without quotes are split in place;
+ * quoted rows go through split_csv_line and the views point into `quoted`,
+ * which must outlive them.
+ */
+inline void split_csv_views(std::string_view line,
+                            std::vector<std::string_view>& out,
+                            std::vector<std::string>& quoted) {
+    out.clear();
+    if (line.find('"') != std::string_view::npos) {
+        quoted = split_csv_line(std::string(line));
+        out.assign(quoted.begin(), quoted.end());
+        return;
+    }
+    size_t start = 0;
+    for (;;) {
+        const size_t comma = line.find(',', start);
+        if (comma == std::string_view::npos) {
+            out.push_back(line.substr(start));
+            return;
+        }
+        out.push_back(line.substr(start, comma - start));
+        start = comma + 1;
+    }
+}
+
+// Amount with currency symbols / thousands separators stripped; 0 if unparsable
+inline double parse_amount(std::string_view s) {
+    std::string clean;
+    clean.reserve(s.size());
+    for (char c : s) {
+        if (std::isdigit(c) || c == '.' || c == '-') clean += c;
+    }
+    double value = 0.0;
+    auto [_, ec] = std::from_chars(clean.data(), clean.data() + clean.size(), value);
+    return ec == std::errc() ? value : 0.0;
+}
+
 inline std::string trim(const std::string& s) {
     auto start = s.find_first_not_of(" \t\r\n");
     if (start == std::string::npos) return {};
@@ -120,17 +199,25 @@ inline CsvParseResult parse_csv(const std::string& content) {
         return result;
     }
 
-    std::istringstream stream(content);
-    std::string line;
+    // Lines are views into `content`; no per-line copies
+    std::string_view rest(content);
+    auto next_line = [&rest](std::string_view& line) {
+        if (rest.empty()) return false;
+        const size_t nl = rest.find('\n');
+        line = rest.substr(0, nl);
+        rest = nl == std::string_view::npos ? std::string_view{} : rest.substr(nl + 1);
+        return true;
+    };
+    std::string_view line;
 
     // Parse header
-    if (!std::getline(stream, line)) {
+    if (!next_line(line)) {
         result.ok = false;
         result.error = "No header row found";
         return result;
     }
 
-    auto headers = split_csv_line(line);
+    auto headers = split_csv_line(std::string(line));
     for (auto& h : headers) {
         h = to_lower(trim(h));
     }
@@ -168,43 +255,36 @@ inline CsvParseResult parse_csv(const std::string& content) {
     int timestamp_i = col_idx["timestamp"];
     int txn_id_i    = col_idx.count("transaction_id") ? col_idx["transaction_id"] : -1;
     int max_col     = std::max({sender_i, receiver_i, amount_i, timestamp_i});
+    const bool has_txn_id = txn_id_i >= 0;
 
     // Parse data rows
+    result.transactions.reserve(std::count(content.begin(), content.end(), '\n'));
+    std::vector<std::string_view> fields;
+    std::vector<std::string>      quoted;  // backing storage for quoted rows
     int line_num = 1;
-    while (std::getline(stream, line)) {
+    while (next_line(line)) {
         ++line_num;
-        line = trim(line);
+        line = trim_view(line);
         if (line.empty()) continue;
 
-        auto fields = split_csv_line(line);
+        split_csv_views(line, fields, quoted);
         if ((int)fields.size() <= max_col) continue; // skip malformed rows
 
-        Transaction txn;
-        txn.sender   = trim(fields[sender_i]);
-        txn.receiver = trim(fields[receiver_i]);
-        if (txn_id_i >= 0 && txn_id_i < (int)fields.size()) {
-            txn.transaction_id = trim(fields[txn_id_i]);
-        }
+        // Rows without both endpoints are dropped before any conversion
+        const auto sender   = trim_view(fields[sender_i]);
+        const auto receiver = trim_view(fields[receiver_i]);
+        if (sender.empty() || receiver.empty()) continue;
 
-        // Parse amount
-        std::string amt_str = trim(fields[amount_i]);
-        // Remove currency symbols and commas
-        std::string clean_amt;
-        for (char c : amt_str) {
-            if (std::isdigit(c) || c == '.' || c == '-') clean_amt += c;
+        // Filled in place in the reserved vector
+        Transaction& txn = result.transactions.emplace_back();
+        txn.sender   = sender;
+        txn.receiver = receiver;
+        if (has_txn_id && txn_id_i < (int)fields.size()) {
+            txn.transaction_id = trim_view(fields[txn_id_i]);
         }
-        try {
-            txn.amount = clean_amt.empty() ? 0.0 : std::stod(clean_amt);
-        } catch (...) {
-            txn.amount = 0.0;
-        }
-
-        // Parse timestamp
-        txn.timestamp = parse_timestamp(trim(fields[timestamp_i]));
 
-        if (!txn.sender.empty() && !txn.receiver.empty()) {
-            result.transactions.push_back(std::move(txn));
-        }
+        txn.amount    = parse_amount(trim_view(fields[amount_i]));
+        txn.timestamp = parse_timestamp(trim_view(fields[timestamp_i]));
     }
 
     if (result.transactions.empty()) {
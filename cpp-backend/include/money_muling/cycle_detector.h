@@ -6,21 +6,32 @@
 // (all edge timestamps within a configured window).
 //
 // Performance optimisations for large graphs:
-//   • O(1) path-membership via unordered_set (was O(path_len) linear scan)
+//   • Node ids factorised to dense ints: adjacency, SCC labels and path
+//     membership are integer arrays; names are only built for results
 //   • Per-root frame budget to prevent exponential blowup on dense graphs
+//   • Global cap on distinct candidate cycles so rejected cycles cannot
+//     stall the search (rotations of one cycle count once)
+//   • Roots enumerated on a small thread pool, merged in root order so the
+//     caps (and results) match a sequential scan
 //   • Nodes sorted by out-degree so high-connectivity hubs found first
 //   • Skips zero-out-degree nodes immediately
+//   • DFS confined to strongly-connected components of size >= 3 (a cycle
+//     can never leave its SCC, so acyclic regions are never expanded)
 // ============================================================================
 
 #include "graph_engine.h"
 #include "models.h"
-#include "red_black_tree.h"
 
 #include <algorithm>
+#include <atomic>
 #include <chrono>
+#include <cstdint>
+#include <future>
+#include <limits>
 #include <optional>
+#include <span>
 #include <string>
-#include <unordered_map>
+#include <thread>
 #include <unordered_set>
 #include <vector>
 
@@ -33,12 +44,18 @@ public:
     static constexpr double DEFAULT_WINDOW_HRS   = 72.0;
     // Max DFS frames per root node — prevents O(∞) on dense graphs
     static constexpr int    MAX_FRAMES_PER_ROOT  = 5000;
+    // Max distinct cycles handed to the temporal check (incl. rejected
+    // ones).  Every cycle is closed once per member root; only the closure
+    // from its earliest root counts, so rotations never use up the budget.
+    static constexpr int    MAX_CANDIDATES       = MAX_CYCLES * 4;
+    // Roots per extra worker thread; small graphs stay single-threaded
+    static constexpr size_t ROOTS_PER_WORKER     = 64;
 
     /**
      * Find all simple cycles of length 3..max_length that are temporally
      * coherent (all edge timestamps within time_window_hours).
      *
-     * Uses RBT-backed temporal checks for O(log n) edge-timestamp lookup.
+     * Temporal checks reduce over per-edge earliest/latest aggregates.
      */
     static std::vector<CycleResult> detect(
         const TransactionGraph& graph,
@@ -50,137 +67,279 @@ public:
         auto window = duration_cast<system_clock::duration>(
             duration<double, std::ratio<3600>>(time_window_hours));
 
-        // Build RBT per edge for fast timestamp range queries
-        // (maps "sender→receiver" → sorted timestamps)
-        // We don't need RBT here since edge_transactions() already stores
-        // timestamps; RBT gives O(log n) range_query on the global stream.
-        // For cycle coherence we just iterate the (small) per-edge list.
-
-        // Collect all nodes — filter out zero-out-degree immediately
-        std::vector<std::string> node_list;
-        node_list.reserve(graph.all_nodes().size());
-        for (const auto& [id, _] : graph.all_nodes()) {
-            if (graph.out_degree(id) > 0)
+        // No time index needed here: each aggregated edge already carries its
+        // earliest/latest timestamp, so coherence is an O(L) reduction.
+
+        // Label SCCs; only components with >= 3 members can hold a cycle
+        std::vector<int> comp_sizes;
+        const auto comp = scc_labels(graph, comp_sizes);
+
+        // Acyclic (or only 2-cycles): nothing to enumerate
+        if (std::none_of(comp_sizes.begin(), comp_sizes.end(),
+                         [](int sz) { return sz >= 3; }))
+            return {};
+
+        // Collect all nodes — filter out zero-out-degree / acyclic immediately
+        const int n = (int)graph.node_count();
+        std::vector<int> node_list;
+        node_list.reserve(n);
+        for (int id = 0; id < n; ++id) {
+            if (!graph.successor_ids(id).empty() && comp_sizes[comp[id]] >= 3)
                 node_list.push_back(id);
         }
 
         // Sort by out-degree descending so hubs are explored first
         // (allows MAX_CYCLES to be hit faster → early exit)
         std::sort(node_list.begin(), node_list.end(),
-            [&](const std::string& a, const std::string& b) {
-                return graph.out_degree(a) > graph.out_degree(b);
+            [&](int a, int b) {
+                return graph.successor_ids(a).size() > graph.successor_ids(b).size();
             });
 
+        // Root order of each node: a cycle's closure counts against
+        // MAX_CANDIDATES only from the member that comes first
+        std::vector<int> ordinal(n, -1);
+        for (int i = 0; i < (int)node_list.size(); ++i) ordinal[node_list[i]] = i;
+
+        // ── DFS-based cycle enumeration, roots in parallel ──────────────
+        // Roots are independent, so workers claim them in list order and
+        // each root's closures are recorded separately.  The caps are then
+        // applied by merging the roots in that same order, which gives the
+        // same result as a sequential scan.  Workers stop claiming roots
+        // once the roots finished so far already exceed a cap: every root
+        // still unclaimed comes after all of them in the merge.
+        std::vector<RootScan> scans(node_list.size());
+        std::atomic<size_t>   next_root{0};
+        std::atomic<int>      accepted_total{0};
+        std::atomic<int>      closures_total{0};
+
+        auto worker = [&] {
+            for (;;) {
+                if (accepted_total.load() >= MAX_CYCLES ||
+                    closures_total.load() >= MAX_CANDIDATES) return;
+                const size_t i = next_root.fetch_add(1);
+                if (i >= node_list.size()) return;
+
+                scans[i] = scan_root(graph, node_list[i], comp, ordinal, max_length, window);
+                accepted_total += (int)scans[i].accepted.size();
+                closures_total += scans[i].closures;
+            }
+        };
+
+        const size_t workers = std::min<size_t>(
+            std::max(1u, std::thread::hardware_concurrency()),
+            (node_list.size() + ROOTS_PER_WORKER - 1) / ROOTS_PER_WORKER);
+        std::vector<std::future<void>> pool;
+        for (size_t w = 1; w < workers; ++w)
+            pool.push_back(std::async(std::launch::async, worker));
+        worker();
+        for (auto& f : pool) f.get();
+
         std::vector<CycleResult> results;
         results.reserve(std::min((int)node_list.size(), MAX_CYCLES));
-        int ring_counter = 0;
+        int candidates = 0;
+        for (auto& scan : scans) {
+            if ((int)results.size() >= MAX_CYCLES || candidates >= MAX_CANDIDATES) break;
+            for (auto& [counted_before, cycle] : scan.accepted) {
+                if (candidates + counted_before >= MAX_CANDIDATES) break;
+                cycle.ring_id = format_ring_id((int)results.size() + 1);
+                results.push_back(std::move(cycle));
+                if ((int)results.size() >= MAX_CYCLES) break;
+            }
+            candidates += scan.closures;
+        }
+        results = deduplicate(std::move(results));
+        return results;
+    }
+
+private:
+    // Closures found from one root: accepted cycles tagged with the number
+    // of counted (first-root) closures from that root that preceded them
+    struct RootScan {
+        std::vector<std::pair<int, CycleResult>> accepted;
+        int                                      closures = 0;  // counted only
+    };
 
-        // ── DFS-based cycle enumeration ─────────────────────────────────
+    /**
+     * Enumerate cycles through `start` inside its SCC.  Paths hold at most
+     * max_length + 1 ids, so membership is a short linear scan over
+     * contiguous ints.
+     */
+    static RootScan scan_root(
+        const TransactionGraph&             graph,
+        int                                 start,
+        const std::vector<int>&             comp,
+        const std::vector<int>&             ordinal,
+        int                                 max_length,
+        std::chrono::system_clock::duration window)
+    {
         struct Frame {
-            std::string              node;
-            std::vector<std::string> path;
-            std::unordered_set<std::string> in_path; // O(1) membership
+            int              node;
+            std::vector<int> path;
         };
 
-        for (const auto& start : node_list) {
-            if ((int)results.size() >= MAX_CYCLES) break;
-
-            std::vector<Frame> stack;
-            stack.reserve(64);
-            stack.push_back({start, {start}, {start}});
-
-            int frames_this_root = 0;
+        RootScan scan;
+        const int root_comp = comp[start];
+        std::vector<Frame> stack;
+        stack.reserve(64);
+        stack.push_back({start, {start}});
+
+        int frames_this_root = 0;
+
+        while (!stack.empty()) {
+            if (++frames_this_root > MAX_FRAMES_PER_ROOT) break;
+
+            auto frame = std::move(stack.back());
+            stack.pop_back();
+
+            const int depth = (int)frame.path.size();
+            if (depth > max_length + 1) continue;
+
+            for (const int next : graph.successor_ids(frame.node)) {
+                // Cycle closes back to start
+                if (next == start && depth >= 3) {
+                    const int counted_before = scan.closures;
+                    const bool first_root = std::all_of(
+                        frame.path.begin(), frame.path.end(),
+                        [&](int id) { return ordinal[id] >= ordinal[start]; });
+                    if (first_root) ++scan.closures;
+                    auto cycle_result = check_temporal_coherence(graph, frame.path, window);
+                    if (cycle_result.has_value())
+                        scan.accepted.emplace_back(counted_before, std::move(*cycle_result));
+                    continue;
+                }
 
-            while (!stack.empty() && (int)results.size() < MAX_CYCLES) {
-                if (++frames_this_root > MAX_FRAMES_PER_ROOT) break;
+                // Only extend if within depth budget, node not in path
+                // and still inside the root's SCC
+                if (depth < max_length && comp[next] == root_comp &&
+                    std::find(frame.path.begin(), frame.path.end(), next) == frame.path.end()) {
+                    Frame nf;
+                    nf.node = next;
+                    nf.path.reserve(depth + 1);
+                    nf.path = frame.path;
+                    nf.path.push_back(next);
+                    stack.push_back(std::move(nf));
+                }
+            }
+        }
+        return scan;
+    }
 
-                auto frame = std::move(stack.back());
-                stack.pop_back();
+    /**
+     * Iterative Tarjan SCC labelling.  Returns node id → component id and
+     * fills comp_sizes[id] with the member count of each component.
+     */
+    static std::vector<int> scc_labels(
+        const TransactionGraph& graph,
+        std::vector<int>&       comp_sizes)
+    {
+        struct Call {
+            int node;
+            std::span<const int>::iterator it, end;
+        };
 
-                const int depth = (int)frame.path.size();
-                if (depth > max_length + 1) continue;
+        const int n = (int)graph.node_count();
+        std::vector<int>  index(n, -1);
+        std::vector<int>  low(n, 0);
+        std::vector<char> on_stack(n, 0);
+        std::vector<int>  comp(n, -1);
+
+        std::vector<int>  stack;
+        std::vector<Call> calls;
+        int next_index = 0;
+
+        auto visit = [&](int v) {
+            index[v] = low[v] = next_index++;
+            on_stack[v] = 1;
+            stack.push_back(v);
+            const auto succ = graph.successor_ids(v);
+            calls.push_back({v, succ.begin(), succ.end()});
+        };
 
-                for (const auto& next : graph.successors(frame.node)) {
-                    // Cycle closes back to start
-                    if (next == start && depth >= 3) {
-                        auto cycle_result = check_temporal_coherence(
-                            graph, frame.path, window, ring_counter);
-                        if (cycle_result.has_value()) {
-                            results.push_back(std::move(*cycle_result));
-                            if ((int)results.size() >= MAX_CYCLES) break;
-                        }
-                        continue;
+        for (int root = 0; root < n; ++root) {
+            if (index[root] >= 0) continue;
+            visit(root);
+
+            while (!calls.empty()) {
+                auto& call = calls.back();
+                if (call.it != call.end) {
+                    const int w = *call.it++;
+                    if (index[w] < 0) {
+                        visit(w);
+                    } else if (on_stack[w]) {
+                        low[call.node] = std::min(low[call.node], index[w]);
                     }
+                    continue;
+                }
 
-                    // Only extend if within depth budget and node not in path
-                    if (depth < max_length && !frame.in_path.count(next)) {
-                        Frame nf;
-                        nf.node    = next;
-                        nf.path    = frame.path;
-                        nf.in_path = frame.in_path;
-                        nf.path.push_back(next);
-                        nf.in_path.insert(next);
-                        stack.push_back(std::move(nf));
-                    }
+                const int v = call.node;
+                calls.pop_back();
+                if (!calls.empty()) {
+                    const int p = calls.back().node;
+                    low[p] = std::min(low[p], low[v]);
+                }
+
+                if (low[v] == index[v]) {
+                    const int id = (int)comp_sizes.size();
+                    int size = 0;
+                    int w;
+                    do {
+                        w = stack.back();
+                        stack.pop_back();
+                        on_stack[w] = 0;
+                        comp[w] = id;
+                        ++size;
+                    } while (w != v);
+                    comp_sizes.push_back(size);
                 }
             }
         }
-
-        results = deduplicate(std::move(results));
-        return results;
+        return comp;
     }
 
-private:
     static std::optional<CycleResult> check_temporal_coherence(
         const TransactionGraph& graph,
-        const std::vector<std::string>& path,
-        std::chrono::system_clock::duration window,
-        int& ring_counter)
+        const std::vector<int>& path,
+        std::chrono::system_clock::duration window)
     {
         using namespace std::chrono;
 
-        TimePoint min_ts = TimePoint::max();
-        TimePoint max_ts = TimePoint::min();
+        // Reduce over the L aggregated edges (earliest/latest/total are
+        // precomputed in build) instead of every transaction on the cycle
+        int64_t min_ts = std::numeric_limits<int64_t>::max();
+        int64_t max_ts = std::numeric_limits<int64_t>::min();
         double total_amount = 0.0;
         int edge_count = (int)path.size();
 
         for (size_t i = 0; i < path.size(); ++i) {
-            const auto& u = path[i];
-            const auto& v = path[(i + 1) % path.size()];
+            const int u = path[i];
+            const int v = path[(i + 1) % path.size()];
 
-            const auto& txns = graph.edge_transactions(u, v);
-            if (txns.empty()) return std::nullopt;
+            const AggEdge* edge = graph.find_agg_edge(u, v);
+            if (!edge || edge->transaction_count == 0) return std::nullopt;
 
-            for (const auto& [amt, ts] : txns) {
-                total_amount += amt;
-                if (ts < min_ts) min_ts = ts;
-                if (ts > max_ts) max_ts = ts;
-            }
+            total_amount += edge->total_amount;
+            min_ts = std::min<int64_t>(min_ts, edge->earliest.time_since_epoch().count());
+            max_ts = std::max<int64_t>(max_ts, edge->latest.time_since_epoch().count());
         }
 
-        if ((max_ts - min_ts) > window) return std::nullopt;
+        const int64_t span_ticks = max_ts - min_ts;
+        if (span_ticks > window.count()) return std::nullopt;
 
-        ++ring_counter;
         double span_hours = duration_cast<duration<double, std::ratio<3600>>>(
-            max_ts - min_ts).count();
+            system_clock::duration(span_ticks)).count();
 
+        // Names are materialised only for accepted cycles; ring_id is
+        // assigned when the roots are merged
         CycleResult cr;
-        cr.ring_id         = "RING_" + pad3(ring_counter);
-        cr.nodes           = path;
+        cr.nodes.reserve(path.size());
+        for (const int id : path) cr.nodes.push_back(graph.node_name(id));
         cr.length          = (int)path.size();
         cr.total_amount    = std::round(total_amount * 100.0) / 100.0;
         cr.time_span_hours = std::round(span_hours * 100.0) / 100.0;
         cr.edge_count      = edge_count;
-        cr.pattern_type    = "cycle";
         return cr;
     }
 
-    static std::string pad3(int n) {
-        char buf[8];
-        snprintf(buf, sizeof(buf), "%03d", n);
-        return std::string(buf);
-    }
-
     static std::vector<CycleResult> deduplicate(std::vector<CycleResult> cycles) {
         std::unordered_set<std::string> seen;
         std::vector<CycleResult> unique;
@@ -8,6 +8,7 @@
 // ============================================================================
 
 #include "models.h"
+#include "graph_engine.h"
 
 #include <algorithm>
 #include <cmath>
@@ -30,19 +31,26 @@ public:
         const std::unordered_map<std::string, AccountProfile>& profiles,
         const std::vector<CycleResult>&   cycles,
         const std::vector<SmurfingResult>& smurfing,
-        const std::vector<ShellResult>&    shells)
+        const std::vector<ShellResult>&    shells,
+        const TransactionGraph&            graph)
     {
-        // Pre-build lookup maps for O(1) per account
-        
+        // Pattern scores are gathered column-wise: one dense slot per graph
+        // node id, so a detector hit is an id lookup plus a store into a
+        // flat array, with no per-account map nodes to allocate.
+        std::vector<PatternScores> hits(graph.node_count());
+        auto slot = [&](const std::string& acct) -> PatternScores* {
+            const int id = graph.node_id(acct);
+            return id >= 0 ? &hits[id] : nullptr;
+        };
+
         // Cycle scores: 
         // Length 3: 60pts, Length 4: 40pts, Length 5: 20pts
         // Bonus: +10 if total amount > 10,000
-        std::unordered_map<std::string, double> cycle_scores;
         for (const auto& c : cycles) {
             double score = 20.0 * (6.0 - std::min(c.length, 5));
             if (c.total_amount > 10000.0) score += 10.0;
             for (const auto& node : c.nodes) {
-                cycle_scores[node] = std::max(cycle_scores[node], score);
+                if (auto* h = slot(node)) h->cycle = std::max(h->cycle, score);
             }
         }
 
@@ -51,74 +59,108 @@ public:
         // +10 High Velocity (>5000/hr)
         // +5 Many Counterparties (>20)
         // +5 High Volume (>100k total)
-        std::unordered_map<std::string, double> smurf_scores;
         for (const auto& s : smurfing) {
             double score = 25.0;
             if (s.velocity_per_hour > 5000.0)     score += 10.0;
             if (s.unique_counterparties > 20)     score += 5.0;
             if (s.total_amount > 100000.0)        score += 5.0;
-            smurf_scores[s.account_id] = std::max(smurf_scores[s.account_id], score);
+            if (auto* h = slot(s.account_id)) h->smurf = std::max(h->smurf, score);
         }
 
         // Shell scores: 
         // 25 per node, scaled by depth
-        std::unordered_map<std::string, double> shell_scores;
         for (const auto& s : shells) {
             double per_node = 25.0;
             for (const auto& node : s.chain) {
-                shell_scores[node] = std::max(shell_scores[node], per_node);
+                if (auto* h = slot(node)) h->shell = std::max(h->shell, per_node);
             }
             // Intermediate nodes get extra risk
+            const double inter = per_node + (10.0 * (double)s.shell_depth); // +10 per depth
             for (const auto& node : s.intermediate_accounts) {
-                shell_scores[node] = std::max(shell_scores[node],
-                    per_node + (10.0 * (double)s.shell_depth)); // +10 per depth
+                if (auto* h = slot(node)) h->shell = std::max(h->shell, inter);
             }
         }
 
-        // Calculate final scores
+        // Calculate final scores: one id lookup for the hits, then pure
+        // arithmetic on the account's flat numeric fields.  Legitimacy
+        // flags are often all unset (no payroll/merchant metadata), so
+        // that case is checked once and scored without the deductions.
+        static const PatternScores no_hits{};
         std::unordered_map<std::string, double> scores;
+        scores.reserve(profiles.size());
 
-        for (const auto& [acct_id, profile] : profiles) {
-            double score = 0.0;
-
-            // 1. Pattern Scores
-            auto ci = cycle_scores.find(acct_id);
-            if (ci != cycle_scores.end()) score += ci->second;
+        auto score_each = [&](auto kernel) {
+            for (const auto& [acct_id, profile] : profiles) {
+                const PatternScores* h = slot(acct_id);
+                scores.emplace(acct_id, kernel(h ? *h : no_hits, profile));
+            }
+        };
+        if (any_legitimacy_flag(profiles)) {
+            score_each(score_account<true>);
+        } else {
+            score_each(score_account<false>);
+        }
 
-            auto si = smurf_scores.find(acct_id);
-            if (si != smurf_scores.end()) score += si->second;
+        return scores;
+    }
 
-            auto shi = shell_scores.find(acct_id);
-            if (shi != shell_scores.end()) score += shi->second;
+private:
+    // Best score per pattern family for one account (0 = no hit)
+    struct PatternScores {
+        double cycle = 0.0;
+        double smurf = 0.0;
+        double shell = 0.0;
+    };
+
+    // True if any profile carries a false-positive (legitimacy) flag
+    static bool any_legitimacy_flag(
+        const std::unordered_map<std::string, AccountProfile>& profiles)
+    {
+        for (const auto& [_, p] : profiles) {
+            if (p.is_payroll | p.is_merchant | p.is_salary | p.is_established_business)
+                return true;
+        }
+        return false;
+    }
 
-            // 2. Centrality / Activity Bonus (limit to +15)
-            // Logarithmic scale of transaction count to detect hubs
-            if (profile.transaction_count > 10) {
-                double centrality = std::log10((double)profile.transaction_count) * 5.0;
-                score += std::min(centrality, 15.0);
-            }
+    /**
+     * Score kernel for one account: pattern scores plus activity bonuses,
+     * minus legitimacy deductions, clamped to [0, 100] and rounded to one
+     * decimal.  Touches no maps or strings.  Deductions=false is only
+     * valid when no legitimacy flag is set.
+     */
+    template <bool Deductions>
+    static double score_account(const PatternScores& hits, const AccountProfile& profile) {
+        // 1. Pattern Scores
+        double score = hits.cycle + hits.smurf + hits.shell;
+
+        // 2. Centrality / Activity Bonus (limit to +15)
+        // Logarithmic scale of transaction count to detect hubs
+        if (profile.transaction_count > 10) {
+            double centrality = std::log10((double)profile.transaction_count) * 5.0;
+            score += std::min(centrality, 15.0);
+        }
 
-            // 3. Amount Anomaly Bonus (limit to +10)
-            // If avg transaction size is huge (>50k), add risk
-            if (profile.transaction_count > 0) {
-                double avg_val = (profile.total_inflow + profile.total_outflow) / (2.0 * profile.transaction_count);
-                if (avg_val > 50000.0) score += 10.0;
-            }
+        // 3. Amount Anomaly Bonus (limit to +10)
+        // If avg transaction size is huge (>50k), add risk
+        if (profile.transaction_count > 0) {
+            double avg_val = (profile.total_inflow + profile.total_outflow) / (2.0 * profile.transaction_count);
+            if (avg_val > 50000.0) score += 10.0;
+        }
 
-            // 4. Legitimacy Deductions (False Positive Control)
+        // 4. Legitimacy Deductions (False Positive Control)
+        if constexpr (Deductions) {
             if (profile.is_payroll)              score -= 50.0; // Stronger deduction
             if (profile.is_merchant)             score -= 40.0;
             if (profile.is_salary)               score -= 30.0;
             if (profile.is_established_business) score -= 40.0;
-
-            // Clamp to [0, 100]
-            score = std::clamp(score, 0.0, 100.0);
-            
-            // Round to 1 decimal
-            scores[acct_id] = std::round(score * 10.0) / 10.0;
         }
 
-        return scores;
+        // Clamp to [0, 100]
+        score = std::clamp(score, 0.0, 100.0);
+
+        // Round to 1 decimal
+        return std::round(score * 10.0) / 10.0;
     }
 };
 
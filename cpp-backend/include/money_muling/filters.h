@@ -7,6 +7,7 @@
 // ============================================================================
 
 #include "models.h"
+#include "graph_engine.h"
 
 #include <algorithm>
 #include <chrono>
@@ -24,25 +25,39 @@ public:
     /**
      * Enrich each AccountProfile with boolean flags for legitimate-account
      * heuristics.  Mutates profiles in-place.
+     *
+     * Transactions are ordered by timestamp once here, so every per-account
+     * group arrives time-sorted and the heuristics never re-sort.  Groups
+     * are indexed by the graph's row-aligned node ids (txns must be the
+     * batch the graph was built from), so grouping never hashes a string.
      */
     static void apply(
         std::unordered_map<std::string, AccountProfile>& profiles,
-        const std::vector<Transaction>& txns)
+        const std::vector<Transaction>& txns,
+        const TransactionGraph&         graph)
     {
-        // Group transactions by receiver and sender
-        std::unordered_map<std::string, std::vector<const Transaction*>> incoming;
-        std::unordered_map<std::string, std::vector<const Transaction*>> outgoing;
-
-        for (const auto& t : txns) {
-            incoming[t.receiver].push_back(&t);
-            outgoing[t.sender].push_back(&t);
+        const auto sender_ids   = graph.sender_ids();
+        const auto receiver_ids = graph.receiver_ids();
+
+        std::vector<int> by_time(txns.size());
+        for (int i = 0; i < (int)txns.size(); ++i) by_time[i] = i;
+        std::stable_sort(by_time.begin(), by_time.end(),
+            [&](int a, int b) { return txns[a].timestamp < txns[b].timestamp; });
+
+        // Group transactions by receiver and sender id
+        const size_t n = graph.node_count();
+        std::vector<std::vector<const Transaction*>> incoming(n);
+        std::vector<std::vector<const Transaction*>> outgoing(n);
+        for (const int row : by_time) {
+            incoming[receiver_ids[row]].push_back(&txns[row]);
+            outgoing[sender_ids[row]].push_back(&txns[row]);
         }
 
         for (auto& [acct_id, profile] : profiles) {
-            const auto& inc = incoming.count(acct_id) ? incoming[acct_id]
-                                                       : empty_txns_;
-            const auto& out = outgoing.count(acct_id) ? outgoing[acct_id]
-                                                       : empty_txns_;
+            // Accounts outside the graph share one empty group
+            const int id = graph.node_id(acct_id);
+            const auto& inc = id >= 0 ? incoming[id] : empty_txns_;
+            const auto& out = id >= 0 ? outgoing[id] : empty_txns_;
 
             profile.is_payroll              = is_payroll(inc);
             profile.is_merchant             = is_merchant(inc, out);
@@ -54,6 +69,14 @@ public:
 private:
     static inline const std::vector<const Transaction*> empty_txns_{};
 
+    // Business-name patterns, compiled once per process
+    static inline const std::regex merchant_name_re_{
+        "(corp|inc|llc|ltd|co\\b|merchant|store|shop|pay|bank|services|mart|pvt)",
+        std::regex::icase | std::regex::optimize};
+    static inline const std::regex business_name_re_{
+        "(corp|inc|llc|ltd|co\\b|merchant|store|shop|pay|bank|services)",
+        std::regex::icase | std::regex::optimize};
+
     // ── Payroll: single dominant sender, monthly, consistent amount ─────
     static bool is_payroll(const std::vector<const Transaction*>& inc,
                            double tolerance = 0.10) {
@@ -73,12 +96,11 @@ private:
         double dominant_ratio = (double)max_count / (double)inc.size();
         if (dominant_ratio < 0.80) return false;
 
-        // Get amounts from dominant sender, sorted by timestamp
+        // Get amounts from dominant sender (inc is already time-sorted)
         std::vector<std::pair<TimePoint, double>> dom_txns;
         for (auto* t : inc) {
             if (t->sender == dominant) dom_txns.push_back({t->timestamp, t->amount});
         }
-        std::sort(dom_txns.begin(), dom_txns.end());
         if (dom_txns.size() < 3) return false;
 
         // Check amount consistency (coefficient of variation)
@@ -142,10 +164,7 @@ private:
     }
 
     static bool looks_like_business(const std::string& id) {
-        static const std::regex biz_pat(
-            "(corp|inc|llc|ltd|co\\b|merchant|store|shop|pay|bank|services|mart|pvt)",
-            std::regex::icase | std::regex::optimize);
-        return std::regex_search(id, biz_pat);
+        return std::regex_search(id, merchant_name_re_);
     }
 
     // ── Salary: one large monthly deposit + regular outgoing bills ─────
@@ -159,7 +178,7 @@ private:
             if (t->amount > max_amt) max_amt = t->amount;
         }
 
-        // Large deposits (> 70% of max)
+        // Large deposits (> 70% of max), in time order
         std::vector<TimePoint> large_ts;
         for (auto* t : inc) {
             if (t->amount > 0.7 * max_amt) large_ts.push_back(t->timestamp);
@@ -167,7 +186,6 @@ private:
         if (large_ts.size() < 2) return false;
 
         // Check monthly pattern
-        std::sort(large_ts.begin(), large_ts.end());
         std::vector<double> diffs;
         for (size_t i = 1; i < large_ts.size(); ++i) {
             auto diff = large_ts[i] - large_ts[i - 1];
@@ -192,15 +210,15 @@ private:
         size_t total = inc.size() + out.size();
         if (total < 20) return false;
 
-        // History span
+        // History span – both groups are time-sorted, so only the ends matter
         TimePoint min_ts = TimePoint::max(), max_ts = TimePoint::min();
-        for (auto* t : inc) {
-            if (t->timestamp < min_ts) min_ts = t->timestamp;
-            if (t->timestamp > max_ts) max_ts = t->timestamp;
+        if (!inc.empty()) {
+            min_ts = inc.front()->timestamp;
+            max_ts = inc.back()->timestamp;
         }
-        for (auto* t : out) {
-            if (t->timestamp < min_ts) min_ts = t->timestamp;
-            if (t->timestamp > max_ts) max_ts = t->timestamp;
+        if (!out.empty()) {
+            min_ts = std::min(min_ts, out.front()->timestamp);
+            max_ts = std::max(max_ts, out.back()->timestamp);
         }
 
         double days = std::chrono::duration_cast<std::chrono::hours>(max_ts - min_ts).count() / 24.0;
@@ -213,18 +231,26 @@ private:
         if (cps.size() < 10) return false;
 
         // Business-name heuristic
-        static const std::regex biz_pat(
-            "(corp|inc|llc|ltd|co\\b|merchant|store|shop|pay|bank|services)",
-            std::regex::icase);
-        if (std::regex_search(acct_id, biz_pat)) return true;
+        if (std::regex_search(acct_id, business_name_re_)) return true;
 
         return total > 100; // high-volume fallback
     }
 
+    // Integer cents + switch: no fmod / division / float compares per amount.
+    // llround is only defined while the cents fit in a long long, so
+    // non-finite amounts are rejected and huge ones (already whole numbers
+    // at this magnitude) take the exact fmod test instead.
     static bool is_round_number(double amount) {
-        double cents = std::fmod(std::round(amount * 100.0), 100.0) / 100.0;
-        return cents == 0.0 || cents == 0.99 || cents == 0.95
-            || cents == 0.49 || cents == 0.50;
+        if (!std::isfinite(amount)) return false;
+        if (std::fabs(amount) >= 1e15) {
+            double cents = std::fmod(std::round(amount * 100.0), 100.0) / 100.0;
+            return cents == 0.0 || cents == 0.99 || cents == 0.95
+                || cents == 0.49 || cents == 0.50;
+        }
+        switch (std::llround(amount * 100.0) % 100) {
+            case 0: case 99: case 95: case 49: case 50: return true;
+            default:                                    return false;
+        }
     }
 };
 
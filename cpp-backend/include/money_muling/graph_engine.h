@@ -1,8 +1,10 @@
 #pragma once
 // ============================================================================
-// Graph Engine – directed multi-graph for transaction network analysis
+// Graph Engine – directed transaction graph for network analysis
 //
-// Adjacency-list representation with O(1) neighbour & edge lookups.
+// Parallel transactions are aggregated per (u,v) as rows are read; no
+// per-transaction edge objects are kept.  Adjacency-list representation
+// with O(1) neighbour & edge lookups.
 // Mirrors Python graph_builder.py: build_graph, collapse, profiles, viz data.
 // ============================================================================
 
@@ -10,22 +12,18 @@
 
 #include <algorithm>
 #include <cmath>
+#include <cstdint>
 #include <regex>
+#include <span>
+#include <stdexcept>
 #include <string>
+#include <string_view>
 #include <unordered_map>
 #include <unordered_set>
 #include <vector>
 
 namespace mm {
 
-// ─── Multi-edge storage ────────────────────────────────────────────────────
-struct MultiEdge {
-    std::string from;
-    std::string to;
-    double      amount = 0.0;
-    TimePoint   timestamp{};
-};
-
 // ─── Node attributes ──────────────────────────────────────────────────────
 struct NodeAttr {
     double total_inflow       = 0.0;
@@ -36,6 +34,8 @@ struct NodeAttr {
 };
 
 // ─── Aggregated edge (for the simple DiGraph) ─────────────────────────────
+// sum / count / min / max over all transactions on u→v, accumulated in the
+// single build pass (every row costs one hash lookup)
 struct AggEdge {
     double total_amount      = 0.0;
     int    transaction_count = 0;
@@ -43,38 +43,57 @@ struct AggEdge {
     TimePoint latest{};
 };
 
+// ─── Per-node detection tags (graph visualisation input) ─────────────────
+// Held in a vector indexed by TransactionGraph node id.
+struct NodeTags {
+    std::vector<std::string> ring_ids;
+    std::vector<std::string> patterns;           // raw types, unique, first-seen order
+    std::vector<std::string> detected_patterns;  // spec-format, sorted + unique
+};
+
 // ─── Transaction Graph ────────────────────────────────────────────────────
 class TransactionGraph {
 public:
     TransactionGraph() = default;
+    // names_ points into nodes_ keys, so a copy would alias the source graph
+    TransactionGraph(const TransactionGraph&)            = delete;
+    TransactionGraph& operator=(const TransactionGraph&) = delete;
 
     // Build from parsed transactions (mirrors graph_builder.build_graph)
     void build(const std::vector<Transaction>& txns) {
         clear();
-        txns_ = &txns;
 
+        // Size the containers for the whole batch up front: at most two
+        // new nodes (one per endpoint) and one aggregated edge per row
+        nodes_.reserve(2 * txns.size());
+        agg_edges_.reserve(txns.size());
+        std::vector<const std::string*> row_keys;  // sender, receiver per row
+        row_keys.reserve(txns.size() * 2);
         for (const auto& t : txns) {
-            // Ensure nodes exist
-            ensure_node(t.sender);
-            ensure_node(t.receiver);
-
-            // Update node attributes
-            auto& sn = nodes_[t.sender];
+            // Update node attributes (try_emplace creates missing nodes, so
+            // each endpoint costs one string hash for the whole row).  Keys
+            // are held by reference, never iterator: an insert that rehashes
+            // invalidates iterators but not references.
+            auto s_it = nodes_.try_emplace(t.sender).first;
+            const std::string& skey = s_it->first;
+            auto& sn = s_it->second;
             sn.total_outflow      += t.amount;
             sn.transaction_count  += 1;
             update_time(sn, t.timestamp);
 
-            auto& rn = nodes_[t.receiver];
+            auto r_it = nodes_.try_emplace(t.receiver).first;
+            const std::string& rkey = r_it->first;
+            auto& rn = r_it->second;
             rn.total_inflow       += t.amount;
             rn.transaction_count  += 1;
             update_time(rn, t.timestamp);
 
-            // Add multi-edge
-            multi_edges_.push_back({t.sender, t.receiver, t.amount, t.timestamp});
+            row_keys.push_back(&skey);
+            row_keys.push_back(&rkey);
 
-            // Aggregate for simple digraph
-            auto key = edge_key(t.sender, t.receiver);
-            auto& agg = agg_edges_[key];
+            // Aggregate for simple digraph, keyed by the two node-key
+            // addresses found above (no "u→v" string to build or hash)
+            auto& agg = agg_edges_[EdgeKey{&skey, &rkey}];
             agg.total_amount      += t.amount;
             agg.transaction_count += 1;
             if (agg.transaction_count == 1) {
@@ -85,14 +104,20 @@ public:
                 if (t.timestamp > agg.latest)   agg.latest   = t.timestamp;
             }
 
-            // Adjacency
-            adj_[t.sender].insert(t.receiver);
-            // Also track reverse adjacency for in-degree lookups
-            rev_adj_[t.receiver].insert(t.sender);
-
-            // Edge data list: (sender, receiver) → list of (amount, timestamp)
-            edge_txns_[{t.sender, t.receiver}].push_back({t.amount, t.timestamp});
+            // Adjacency: the aggregate already deduplicates parallel edges,
+            // so only the first transaction on u→v touches the sets.  Both
+            // sides hold views of the interned node keys, never copies.
+            if (agg.transaction_count == 1) {
+                const std::string_view sv = skey;
+                const std::string_view rv = rkey;
+                adj_[sv].insert(rv);
+                // Also track reverse adjacency for in-degree lookups
+                rev_adj_[rv].insert(sv);
+            }
         }
+
+        index_nodes(row_keys);
+        classify_accounts();
     }
 
     // ── Node accessors ─────────────────────────────────────────────────
@@ -102,22 +127,24 @@ public:
     size_t node_count() const { return nodes_.size(); }
 
     // ── Edge accessors ─────────────────────────────────────────────────
-    const std::unordered_map<std::string, AggEdge>& all_agg_edges() const { return agg_edges_; }
     bool has_edge(const std::string& u, const std::string& v) const {
-        return agg_edges_.count(edge_key(u, v));
+        return find_agg_edge(u, v) != nullptr;
     }
     const AggEdge& agg_edge(const std::string& u, const std::string& v) const {
-        return agg_edges_.at(edge_key(u, v));
+        const AggEdge* edge = find_agg_edge(u, v);
+        if (!edge) throw std::out_of_range("agg_edge: no edge " + u + "→" + v);
+        return *edge;
     }
 
     // ── Adjacency ──────────────────────────────────────────────────────
-    const std::unordered_set<std::string>& successors(const std::string& n) const {
-        static const std::unordered_set<std::string> empty;
+    // Neighbour names are views of the node keys (valid while the graph is)
+    const std::unordered_set<std::string_view>& successors(const std::string& n) const {
+        static const std::unordered_set<std::string_view> empty;
         auto it = adj_.find(n);
         return it != adj_.end() ? it->second : empty;
     }
-    const std::unordered_set<std::string>& predecessors(const std::string& n) const {
-        static const std::unordered_set<std::string> empty;
+    const std::unordered_set<std::string_view>& predecessors(const std::string& n) const {
+        static const std::unordered_set<std::string_view> empty;
         auto it = rev_adj_.find(n);
         return it != rev_adj_.end() ? it->second : empty;
     }
@@ -131,26 +158,50 @@ public:
         return it != rev_adj_.end() ? (int)it->second.size() : 0;
     }
 
-    // ── Edge transaction data ──────────────────────────────────────────
-    using TxnPair = std::pair<double, TimePoint>;
-    const std::vector<TxnPair>& edge_transactions(const std::string& u,
-                                                    const std::string& v) const {
-        static const std::vector<TxnPair> empty;
-        auto it = edge_txns_.find({u, v});
-        return it != edge_txns_.end() ? it->second : empty;
+    // Aggregated edge or nullptr when u→v does not exist
+    const AggEdge* find_agg_edge(const std::string& u, const std::string& v) const {
+        auto iu = nodes_.find(u);
+        auto iv = nodes_.find(v);
+        if (iu == nodes_.end() || iv == nodes_.end()) return nullptr;
+        auto it = agg_edges_.find(EdgeKey{&iu->first, &iv->first});
+        return it != agg_edges_.end() ? &it->second : nullptr;
+    }
+
+    // ── Dense integer ids ──────────────────────────────────────────────
+    // Ids follow all_nodes() iteration order and id adjacency follows the
+    // string adjacency order, so id-based traversals visit nodes in the
+    // same order as string-based ones.
+    int node_id(const std::string& n) const {
+        auto it = index_.find(n);
+        return it != index_.end() ? it->second : -1;
+    }
+    const std::string& node_name(int id) const { return *names_[id]; }
+    bool is_business(int id) const { return is_business_[id]; }
+
+    // CSR slices: nbr[ptr[id] .. ptr[id + 1])
+    std::span<const int> successor_ids(int id) const {
+        return {out_nbr_.data() + out_ptr_[id], out_nbr_.data() + out_ptr_[id + 1]};
+    }
+    std::span<const int> predecessor_ids(int id) const {
+        return {in_nbr_.data() + in_ptr_[id], in_nbr_.data() + in_ptr_[id + 1]};
+    }
+
+    // Row-aligned endpoint ids: sender_ids()[i] / receiver_ids()[i] are the
+    // node ids of txns[i] as passed to build(); node_name() maps them back
+    std::span<const int> sender_ids() const   { return row_sender_; }
+    std::span<const int> receiver_ids() const { return row_receiver_; }
+
+    // Aggregated edge u→v by id, or nullptr (one integer-keyed probe)
+    const AggEdge* find_agg_edge(int u, int v) const {
+        auto it = agg_ids_.find(id_pair(u, v));
+        return it != agg_ids_.end() ? it->second : nullptr;
     }
 
     // ── All unique directed edges (u→v) ────────────────────────────────
     std::vector<std::pair<std::string, std::string>> directed_edges() const {
         std::vector<std::pair<std::string, std::string>> out;
-        out.reserve(agg_edges_.size());
-        for (const auto& [key, _] : agg_edges_) {
-            auto sep = key.find("→");
-            if (sep != std::string::npos) {
-                // UTF-8 "→" is 3 bytes
-                out.emplace_back(key.substr(0, sep), key.substr(sep + 3));
-            }
-        }
+        out.reserve(edge_list_.size());
+        for (const auto& e : edge_list_) out.emplace_back(*names_[e.u], *names_[e.v]);
         return out;
     }
 
@@ -158,41 +209,46 @@ public:
     std::unordered_map<std::string, AccountProfile> build_profiles() const {
         std::unordered_map<std::string, AccountProfile> profiles;
         profiles.reserve(nodes_.size());
-        // Pre-build business cache once — avoids repeated regex per node
-        build_business_cache();
-
+        // nodes_ iteration order is id order, so idx is the dense node id
+        int idx = 0;
         for (const auto& [id, attr] : nodes_) {
-            AccountProfile p;
+            // Filled in place in the map slot; no temporary profile
+            auto& p = profiles.try_emplace(id).first->second;
             p.account_id        = id;
             p.total_inflow      = attr.total_inflow;
             p.total_outflow     = attr.total_outflow;
             p.transaction_count = attr.transaction_count;
             p.first_seen        = attr.first_seen;
             p.last_seen         = attr.last_seen;
-            p.account_type      = is_business_cached(id) ? "business" : "individual";
-            profiles[id]        = std::move(p);
+            p.account_type      = is_business_[idx++] ? "business" : "individual";
         }
         return profiles;
     }
 
     // ── Build graph visualization data ─────────────────────────────────
+    // node_tags (indexed by node id) is consumed: its per-account vectors
+    // are moved into the nodes instead of copied (callers std::move it in)
     GraphData build_graph_data(
         const std::unordered_map<std::string, double>& scores,
-        const std::unordered_map<std::string, std::vector<std::string>>& ring_map,
-        const std::unordered_map<std::string, std::vector<std::string>>& pattern_map
+        std::vector<NodeTags>                          node_tags
     ) const {
         GraphData gd;
         gd.nodes.reserve(nodes_.size());
-        gd.edges.reserve(agg_edges_.size());
-        // Ensure business cache is warm
-        build_business_cache();
-
-        // Nodes
+        gd.edges.reserve(edge_list_.size());
+        // Per-node edge attributes, resolved once here so the edge pass
+        // below is pure id indexing (no per-edge name lookups)
+        std::vector<char>               node_suspicious(nodes_.size(), 0);
+        std::vector<const std::string*> node_pattern(nodes_.size(), nullptr);
+
+        // Nodes (idx is the dense node id, as in build_profiles)
+        int idx = 0;
         for (const auto& [id, attr] : nodes_) {
-            GraphNode gn;
+            const int nid = idx;
+            // Built in place in the reserved vector
+            GraphNode& gn = gd.nodes.emplace_back();
             gn.id                = id;
             gn.label             = id;
-            gn.account_type      = is_business_cached(id) ? "business" : "individual";
+            gn.account_type      = is_business_[idx++] ? "business" : "individual";
             gn.total_inflow      = attr.total_inflow;
             gn.total_outflow     = attr.total_outflow;
             gn.transaction_count = attr.transaction_count;
@@ -200,42 +256,27 @@ public:
             auto sit = scores.find(id);
             gn.suspicion_score = sit != scores.end() ? sit->second : 0.0;
             gn.is_suspicious   = gn.suspicion_score >= 25.0;
-
-            auto rit = ring_map.find(id);
-            if (rit != ring_map.end()) gn.ring_ids = rit->second;
+            node_suspicious[nid] = gn.is_suspicious;
 
             // patterns = raw type strings; detected_patterns = spec-format
-            // (spec-format strings are injected by analysis_engine.h post-build)
-            auto pit = pattern_map.find(id);
-            if (pit != pattern_map.end()) gn.patterns = pit->second;
-
-            gd.nodes.push_back(std::move(gn));
+            NodeTags& tags = node_tags[nid];
+            gn.ring_ids = std::move(tags.ring_ids);
+            gn.patterns = std::move(tags.patterns);
+            gn.detected_patterns = std::move(tags.detected_patterns);
+            if (!gn.patterns.empty()) node_pattern[nid] = &gn.patterns.front();
         }
 
-        // Edges
-        for (const auto& [key, agg] : agg_edges_) {
-            auto sep = key.find("→");
-            if (sep == std::string::npos) continue;
-
-            GraphEdge ge;
-            ge.source            = key.substr(0, sep);
-            ge.target            = key.substr(sep + 3);
-            ge.total_amount      = agg.total_amount;
-            ge.transaction_count = agg.transaction_count;
-
-            // Mark suspicious if either endpoint is suspicious
-            auto s1 = scores.find(ge.source);
-            auto s2 = scores.find(ge.target);
-            double sc1 = s1 != scores.end() ? s1->second : 0.0;
-            double sc2 = s2 != scores.end() ? s2->second : 0.0;
-            ge.is_suspicious = (sc1 >= 25.0 || sc2 >= 25.0);
-
-            // Determine pattern type from pattern_map
-            auto pp = pattern_map.find(ge.source);
-            if (pp != pattern_map.end() && !pp->second.empty())
-                ge.pattern_type = pp->second.front();
-
-            gd.edges.push_back(std::move(ge));
+        // Edges, straight from the aggregated edge list
+        for (const auto& e : edge_list_) {
+            GraphEdge& ge = gd.edges.emplace_back();
+            ge.source            = *names_[e.u];
+            ge.target            = *names_[e.v];
+            ge.total_amount      = e.agg->total_amount;
+            ge.transaction_count = e.agg->transaction_count;
+
+            // Suspicious if either endpoint is; pattern type from the source
+            ge.is_suspicious = node_suspicious[e.u] || node_suspicious[e.v];
+            if (node_pattern[e.u]) ge.pattern_type = *node_pattern[e.u];
         }
 
         return gd;
@@ -243,42 +284,120 @@ public:
 
     void clear() {
         nodes_.clear();
-        multi_edges_.clear();
         agg_edges_.clear();
         adj_.clear();
         rev_adj_.clear();
-        edge_txns_.clear();
-        business_cache_.clear();
-        txns_ = nullptr;
+        is_business_.clear();
+        names_.clear();
+        index_.clear();
+        out_ptr_.clear();
+        out_nbr_.clear();
+        in_ptr_.clear();
+        in_nbr_.clear();
+        agg_ids_.clear();
+        edge_list_.clear();
+        row_sender_.clear();
+        row_receiver_.clear();
     }
 
 private:
-    // Hash for pair<string,string>
-    struct PairHash {
-        size_t operator()(const std::pair<std::string, std::string>& p) const {
-            auto h1 = std::hash<std::string>{}(p.first);
-            auto h2 = std::hash<std::string>{}(p.second);
-            return h1 ^ (h2 << 32 | h2 >> 32);
+    std::unordered_map<std::string, NodeAttr>                  nodes_;
+    // Edge key: addresses of the endpoint keys in nodes_ (stable for the
+    // life of the map), so aggregation never re-hashes account strings
+    struct EdgeKey {
+        const std::string* u;
+        const std::string* v;
+        bool operator==(const EdgeKey&) const = default;
+    };
+    struct EdgeKeyHash {
+        size_t operator()(const EdgeKey& k) const {
+            const size_t h = std::hash<const void*>{}(k.u);
+            return h ^ (std::hash<const void*>{}(k.v) + 0x9e3779b97f4a7c15ULL + (h << 6) + (h >> 2));
         }
     };
 
-    std::unordered_map<std::string, NodeAttr>                  nodes_;
-    std::vector<MultiEdge>                                      multi_edges_;
-    std::unordered_map<std::string, AggEdge>                   agg_edges_;  // key = "u→v"
-    std::unordered_map<std::string, std::unordered_set<std::string>> adj_;
-    std::unordered_map<std::string, std::unordered_set<std::string>> rev_adj_;
-    std::unordered_map<std::pair<std::string,std::string>,
-                       std::vector<TxnPair>, PairHash>         edge_txns_;
-    const std::vector<Transaction>* txns_ = nullptr;
-    mutable std::unordered_map<std::string, bool> business_cache_;  // id → is_business
-
-    static std::string edge_key(const std::string& u, const std::string& v) {
-        return u + "→" + v;
+    std::unordered_map<EdgeKey, AggEdge, EdgeKeyHash>          agg_edges_;
+    // Every name below is a view of a nodes_ key: each account string is
+    // stored once (interned) however many maps and sets refer to it
+    std::unordered_map<std::string_view, std::unordered_set<std::string_view>> adj_;
+    std::unordered_map<std::string_view, std::unordered_set<std::string_view>> rev_adj_;
+
+    // Integer view of the graph, built once at the end of build()
+    std::vector<const std::string*>                  names_;    // id → key in nodes_
+    std::unordered_map<std::string_view, int>        index_;    // name → id
+    std::vector<int>                                 out_ptr_;  // CSR offsets, size n + 1
+    std::vector<int>                                 out_nbr_;
+    std::vector<int>                                 in_ptr_;
+    std::vector<int>                                 in_nbr_;
+    std::vector<char>                                is_business_;  // id → name looks like a business
+    // Aggregated edges in id space (source id, then CSR neighbour order)
+    struct IdEdge {
+        int            u;
+        int            v;
+        const AggEdge* agg;
+    };
+    std::vector<IdEdge>                              edge_list_;
+    std::unordered_map<uint64_t, const AggEdge*>     agg_ids_;  // (u,v) → agg_edges_ entry
+    std::vector<int>                                 row_sender_;    // txn row → sender id
+    std::vector<int>                                 row_receiver_;  // txn row → receiver id
+
+    static uint64_t id_pair(int u, int v) {
+        return ((uint64_t)(uint32_t)u << 32) | (uint32_t)v;
     }
 
-    void ensure_node(const std::string& id) {
-        if (!nodes_.count(id)) {
-            nodes_[id] = NodeAttr{};
+    void index_nodes(const std::vector<const std::string*>& row_keys) {
+        const size_t n = nodes_.size();
+        names_.reserve(n);
+        index_.reserve(n);
+        // Key address → id: resolving rows and edges hashes pointers only
+        std::unordered_map<const std::string*, int> id_of;
+        id_of.reserve(n);
+        for (const auto& [id, _] : nodes_) {
+            index_.emplace(id, (int)names_.size());
+            id_of.emplace(&id, (int)names_.size());
+            names_.push_back(&id);
+        }
+
+        build_csr(adj_, out_ptr_, out_nbr_);
+        build_csr(rev_adj_, in_ptr_, in_nbr_);
+
+        agg_ids_.reserve(agg_edges_.size());
+        for (const auto& [key, agg] : agg_edges_)
+            agg_ids_.emplace(id_pair(id_of.at(key.u), id_of.at(key.v)), &agg);
+
+        // Edge list in CSR order: agg_edges_ is keyed by addresses, so its
+        // own iteration order would differ from run to run
+        edge_list_.reserve(agg_edges_.size());
+        for (int u = 0; u < (int)n; ++u) {
+            for (const int v : successor_ids(u))
+                edge_list_.push_back({u, v, agg_ids_.at(id_pair(u, v))});
+        }
+
+        const size_t rows = row_keys.size() / 2;
+        row_sender_.resize(rows);
+        row_receiver_.resize(rows);
+        for (size_t i = 0; i < rows; ++i) {
+            row_sender_[i]   = id_of.at(row_keys[2 * i]);
+            row_receiver_[i] = id_of.at(row_keys[2 * i + 1]);
+        }
+    }
+
+    // Flatten a name adjacency map into CSR offsets + neighbour ids,
+    // keeping each node's neighbours in set iteration order
+    void build_csr(
+        const std::unordered_map<std::string_view, std::unordered_set<std::string_view>>& adj,
+        std::vector<int>& ptr,
+        std::vector<int>& nbr) const
+    {
+        const size_t n = names_.size();
+        ptr.assign(n + 1, 0);
+        for (const auto& [u, vs] : adj) ptr[index_.at(u) + 1] = (int)vs.size();
+        for (size_t i = 0; i < n; ++i) ptr[i + 1] += ptr[i];
+
+        nbr.resize(ptr[n]);
+        for (const auto& [u, vs] : adj) {
+            int pos = ptr[index_.at(u)];
+            for (const auto& v : vs) nbr[pos++] = index_.at(v);
         }
     }
 
@@ -292,28 +411,14 @@ private:
         }
     }
 
-    // Pre-populate business_cache_ for all nodes — called once per build
-    void build_business_cache() const {
-        if (business_cache_.size() == nodes_.size()) return;  // already warm
-        static const std::regex pat(
-            "(corp|inc|llc|ltd|co\\b|merchant|store|shop|pay|bank|services)",
-            std::regex::icase | std::regex::optimize);
-        for (const auto& [id, _] : nodes_) {
-            if (!business_cache_.count(id))
-                business_cache_[id] = std::regex_search(id, pat);
-        }
-    }
-
-    bool is_business_cached(const std::string& id) const {
-        auto it = business_cache_.find(id);
-        return it != business_cache_.end() && it->second;
-    }
-
-    static bool looks_like_business(const std::string& id) {
+    // Classify every account name once per build, indexed by node id
+    void classify_accounts() {
         static const std::regex pat(
             "(corp|inc|llc|ltd|co\\b|merchant|store|shop|pay|bank|services)",
             std::regex::icase | std::regex::optimize);
-        return std::regex_search(id, pat);
+        is_business_.resize(names_.size());
+        for (size_t id = 0; id < names_.size(); ++id)
+            is_business_[id] = std::regex_search(*names_[id], pat);
     }
 };
 
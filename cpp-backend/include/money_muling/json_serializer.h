@@ -9,12 +9,26 @@
 #include "models.h"
 #include <nlohmann/json.hpp>
 
+#include <utility>
+#include <vector>
+
 namespace mm {
 
 using json = nlohmann::json;
 
 // ── helpers ──────────────────────────────────────────────────────────────
 
+// Serialise a vector into a pre-sized JSON array (no regrowth, elements
+// moved in rather than copied)
+template <typename T, typename Fn>
+inline json array_to_json(const std::vector<T>& items, Fn&& to_json) {
+    json arr = json::array();
+    auto& out = arr.get_ref<json::array_t&>();
+    out.reserve(items.size());
+    for (const auto& item : items) out.emplace_back(to_json(item));
+    return arr;
+}
+
 inline json summary_to_json(const Summary& s) {
     return json{
         {"total_accounts_analyzed",     s.total_accounts_analyzed},
@@ -120,16 +134,10 @@ inline json graph_edge_to_json(const GraphEdge& e) {
 }
 
 inline json graph_data_to_json(const GraphData& gd) {
-    json nodes_arr = json::array();
-    for (const auto& n : gd.nodes) nodes_arr.push_back(graph_node_to_json(n));
-
-    json edges_arr = json::array();
-    for (const auto& e : gd.edges) edges_arr.push_back(graph_edge_to_json(e));
-
-    return json{
-        {"nodes", nodes_arr},
-        {"edges", edges_arr}
-    };
+    json j;
+    j["nodes"] = array_to_json(gd.nodes, graph_node_to_json);
+    j["edges"] = array_to_json(gd.edges, graph_edge_to_json);
+    return j;
 }
 
 // ── Full analysis result (status polling endpoint) ───────────────────────
@@ -144,17 +152,12 @@ inline json analysis_result_to_json(const AnalysisResult& r) {
         json result_obj;
         result_obj["summary"] = summary_to_json(r.summary);
 
-        json sa_arr = json::array();
-        for (const auto& sa : r.suspicious_accounts)
-            sa_arr.push_back(suspicious_account_to_json(sa));
-        result_obj["suspicious_accounts"] = sa_arr;
+        result_obj["suspicious_accounts"] =
+            array_to_json(r.suspicious_accounts, suspicious_account_to_json);
+        result_obj["fraud_rings"] =
+            array_to_json(r.fraud_rings, fraud_ring_to_json);
 
-        json fr_arr = json::array();
-        for (const auto& fr : r.fraud_rings)
-            fr_arr.push_back(fraud_ring_to_json(fr));
-        result_obj["fraud_rings"] = fr_arr;
-
-        j["result"] = result_obj;
+        j["result"] = std::move(result_obj);
 
     } else if (r.status == AnalysisStatus::FAILED) {
         j["error"] = r.error;
@@ -191,15 +194,9 @@ inline json download_summary_to_json(const Summary& s) {
 inline json download_result_to_json(const AnalysisResult& r) {
     json j;
 
-    json sa_arr = json::array();
-    for (const auto& sa : r.suspicious_accounts)
-        sa_arr.push_back(download_suspicious_account_to_json(sa));
-    j["suspicious_accounts"] = sa_arr;
-
-    json fr_arr = json::array();
-    for (const auto& fr : r.fraud_rings)
-        fr_arr.push_back(fraud_ring_to_json(fr));
-    j["fraud_rings"] = fr_arr;
+    j["suspicious_accounts"] =
+        array_to_json(r.suspicious_accounts, download_suspicious_account_to_json);
+    j["fraud_rings"] = array_to_json(r.fraud_rings, fraud_ring_to_json);
 
     j["summary"] = download_summary_to_json(r.summary);
 
@@ -5,6 +5,7 @@
 // ============================================================================
 
 #include <chrono>
+#include <cstdio>
 #include <cmath>
 #include <string>
 #include <vector>
@@ -41,6 +42,13 @@ inline const char* pattern_to_string(PatternType p) {
     return "unknown";
 }
 
+// ─── Ring ids ──────────────────────────────────────────────────────────────
+inline std::string format_ring_id(int n) {
+    char buf[24];
+    snprintf(buf, sizeof(buf), "RING_%03d", n);
+    return std::string(buf);
+}
+
 // ─── Transaction (single CSV row) ──────────────────────────────────────────
 struct Transaction {
     std::string transaction_id;
@@ -51,18 +59,21 @@ struct Transaction {
 };
 
 // ─── Account Profile ────────────────────────────────────────────────────────
+// Pipeline-internal (never serialised): one per account, so it is kept
+// compact – the type is a static literal, and members are ordered so the
+// flags pack into the tail instead of padding between strings.
 struct AccountProfile {
     std::string account_id;
-    bool is_payroll              = false;
-    bool is_merchant             = false;
-    bool is_salary               = false;
-    bool is_established_business = false;
-    std::string account_type     = "unknown"; // individual / business / unknown
-    double total_inflow          = 0.0;
-    double total_outflow         = 0.0;
-    int    transaction_count     = 0;
-    TimePoint first_seen{};
-    TimePoint last_seen{};
+    double      total_inflow            = 0.0;
+    double      total_outflow           = 0.0;
+    TimePoint   first_seen{};
+    TimePoint   last_seen{};
+    const char* account_type            = "unknown"; // individual / business / unknown
+    int         transaction_count       = 0;
+    bool        is_payroll              = false;
+    bool        is_merchant             = false;
+    bool        is_salary               = false;
+    bool        is_established_business = false;
 };
 
 // ─── Cycle Detection Result ────────────────────────────────────────────────
@@ -100,12 +111,14 @@ struct ShellResult {
 };
 
 // ─── Suspicious Account ────────────────────────────────────────────────────
+// account_type (here and in GraphNode) is one of a few static literals, so
+// it is held as a pointer: smaller records and cheaper moves when sorting.
 struct SuspiciousAccount {
     std::string              account_id;
     double                   suspicion_score = 0.0;
     std::vector<std::string> detected_patterns;
     std::string              ring_id;
-    std::string              account_type;
+    const char*              account_type  = "";
     double                   total_inflow  = 0.0;
     double                   total_outflow = 0.0;
     int                      transaction_count = 0;
@@ -138,7 +151,7 @@ struct Summary {
 struct GraphNode {
     std::string              id;
     std::string              label;
-    std::string              account_type;
+    const char*              account_type     = "";
     double                   suspicion_score  = 0.0;
     double                   total_inflow     = 0.0;
     double                   total_outflow    = 0.0;
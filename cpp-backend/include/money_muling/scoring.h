@@ -14,10 +14,9 @@
 
 #include <algorithm>
 #include <cmath>
-#include <set>
 #include <string>
+#include <string_view>
 #include <unordered_map>
-#include <unordered_set>
 #include <vector>
 
 namespace mm {
@@ -32,95 +31,56 @@ public:
         const std::unordered_map<std::string, AccountProfile>& profiles,
         const std::vector<CycleResult>&   cycles,
         const std::vector<SmurfingResult>& smurfing,
-        const std::vector<ShellResult>&    shells)
+        const std::vector<ShellResult>&    shells,
+        const TransactionGraph&            graph)
     {
-        return DecisionTree::score_all(profiles, cycles, smurfing, shells);
+        return DecisionTree::score_all(profiles, cycles, smurfing, shells, graph);
     }
 
     // -----------------------------------------------------------------------
     // build_suspicious_accounts
     // -----------------------------------------------------------------------
+    /**
+     * Suspicious accounts (score > 0) from the per-account tags collected
+     * by the pipeline, so the detector results are not walked a second
+     * time.  detected_patterns are the spec-format tags; ring_ids are
+     * sorted.
+     */
     static std::vector<SuspiciousAccount> build_suspicious_accounts(
         const std::unordered_map<std::string, double>&          scores,
         const std::unordered_map<std::string, AccountProfile>&  profiles,
-        const std::vector<CycleResult>&   cycles,
-        const std::vector<SmurfingResult>& smurfing,
-        const std::vector<ShellResult>&    shells,
-        const TransactionGraph&            graph)
+        const std::vector<NodeTags>&                            node_tags,
+        const TransactionGraph&                                 graph)
     {
-        // Build pattern_map  account_id -> set of pattern strings
-        // Build ring_map     account_id -> set of ring_ids
-        std::unordered_map<std::string, std::set<std::string>> pattern_map;
-        std::unordered_map<std::string, std::set<std::string>> ring_map;
-
-        for (const auto& c : cycles) {
-            for (const auto& node : c.nodes) {
-                pattern_map[node].insert("cycle");
-                ring_map[node].insert(c.ring_id);
-            }
-        }
-        for (const auto& s : smurfing) {
-            pattern_map[s.account_id].insert(s.pattern_type);
-            ring_map[s.account_id].insert(s.ring_id);
-        }
-        for (const auto& s : shells) {
-            for (const auto& node : s.chain) {
-                pattern_map[node].insert("shell");
-                ring_map[node].insert(s.ring_id);
-            }
-        }
-
-        // Build suspicious accounts (score > 0)
+        const auto flagged = flagged_scores(scores);
         std::vector<SuspiciousAccount> result;
+        result.reserve(flagged.size());
+        std::vector<int> connected;  // neighbour-id scratch, reused per account
 
-        for (const auto& [acct_id, score] : scores) {
-            if (score <= 0.0) continue;
+        for (const auto* entry : flagged) {
+            const auto& [acct_id, score] = *entry;
 
-            SuspiciousAccount sa;
-            sa.account_id     = acct_id;
+            SuspiciousAccount& sa = result.emplace_back();
+            sa.account_id      = acct_id;
             sa.suspicion_score = score;
 
-            // Detected patterns
-            auto pit = pattern_map.find(acct_id);
-            if (pit != pattern_map.end()) {
-                sa.detected_patterns.assign(pit->second.begin(),
-                                            pit->second.end());
-            }
+            // The node id is looked up once and indexes the tags and the CSR
+            const int id = graph.node_id(acct_id);
+            if (id >= 0) {
+                const NodeTags& tags = node_tags[id];
+                sa.detected_patterns = tags.detected_patterns;
 
-            // Ring IDs
-            auto rit = ring_map.find(acct_id);
-            if (rit != ring_map.end()) {
-                sa.ring_ids.assign(rit->second.begin(), rit->second.end());
+                // An account appears once per result, so its ring ids are
+                // already distinct; only the order needs fixing
+                sa.ring_ids = tags.ring_ids;
+                std::sort(sa.ring_ids.begin(), sa.ring_ids.end());
                 if (!sa.ring_ids.empty()) sa.ring_id = sa.ring_ids.front();
             }
 
-            // Profile data
-            auto profi = profiles.find(acct_id);
-            if (profi != profiles.end()) {
-                sa.account_type      = profi->second.account_type;
-                sa.total_inflow      = profi->second.total_inflow;
-                sa.total_outflow     = profi->second.total_outflow;
-                sa.transaction_count = profi->second.transaction_count;
-            }
-
-            // Connected accounts (graph neighbours)
-            std::unordered_set<std::string> connected;
-            for (const auto& s : graph.successors(acct_id))   connected.insert(s);
-            for (const auto& p : graph.predecessors(acct_id)) connected.insert(p);
-            connected.erase(acct_id);
-            sa.connected_accounts.assign(connected.begin(), connected.end());
-
-            result.push_back(std::move(sa));
+            fill_account_data(sa, id, profiles, graph, connected);
         }
 
-        // Sort by suspicion_score descending, then alphabetically by account_id
-        std::sort(result.begin(), result.end(),
-            [](const SuspiciousAccount& a, const SuspiciousAccount& b) {
-                if (a.suspicion_score != b.suspicion_score)
-                    return a.suspicion_score > b.suspicion_score;
-                return a.account_id < b.account_id;
-            });
-
+        sort_by_score(result);
         return result;
     }
 
@@ -140,40 +100,32 @@ public:
             FraudRing& ring = ring_map[c.ring_id];
             ring.ring_id      = c.ring_id;
             ring.pattern_type = "cycle";
-            std::set<std::string> members(c.nodes.begin(), c.nodes.end());
-            ring.member_accounts.assign(members.begin(), members.end());
-
-            // Risk = max score among members
-            double max_score = 0.0;
-            for (const auto& node : c.nodes) {
-                auto it = scores.find(node);
-                if (it != scores.end())
-                    max_score = std::max(max_score, it->second);
-            }
-            ring.risk_score = max_score;
+            ring.member_accounts = sorted_members(c.nodes);
         }
 
-        // From smurfing  –  group by ring_id
+        // From smurfing  –  group by ring_id.  A group holds a few
+        // accounts, so members are gathered as views into the results and
+        // sorted/deduplicated once, rather than kept in a std::set.
         {
-            std::unordered_map<std::string, std::set<std::string>> smurf_groups;
-            std::unordered_map<std::string, std::string> smurf_pattern;
+            struct SmurfGroup {
+                std::vector<std::string_view> members;
+                std::string_view              pattern_type;  // last one wins
+            };
+            std::unordered_map<std::string, SmurfGroup> smurf_groups;
             for (const auto& s : smurfing) {
-                smurf_groups[s.ring_id].insert(s.account_id);
-                smurf_pattern[s.ring_id] = s.pattern_type;
+                auto& group = smurf_groups[s.ring_id];
+                group.members.push_back(s.account_id);
+                group.pattern_type = s.pattern_type;
             }
-            for (auto& [rid, members] : smurf_groups) {
+            for (auto& [rid, group] : smurf_groups) {
+                auto& members = group.members;
+                std::sort(members.begin(), members.end());
+                members.erase(std::unique(members.begin(), members.end()), members.end());
+
                 FraudRing& ring = ring_map[rid];
                 ring.ring_id      = rid;
-                ring.pattern_type = smurf_pattern[rid];
+                ring.pattern_type = group.pattern_type;
                 ring.member_accounts.assign(members.begin(), members.end());
-
-                double max_score = 0.0;
-                for (const auto& acct : members) {
-                    auto it = scores.find(acct);
-                    if (it != scores.end())
-                        max_score = std::max(max_score, it->second);
-                }
-                ring.risk_score = max_score;
             }
         }
 
@@ -182,31 +134,126 @@ public:
             FraudRing& ring = ring_map[s.ring_id];
             ring.ring_id      = s.ring_id;
             ring.pattern_type = "shell";
-            std::set<std::string> members(s.chain.begin(), s.chain.end());
-            ring.member_accounts.assign(members.begin(), members.end());
-
-            double max_score = 0.0;
-            for (const auto& node : s.chain) {
-                auto it = scores.find(node);
-                if (it != scores.end())
-                    max_score = std::max(max_score, it->second);
-            }
-            ring.risk_score = max_score;
+            ring.member_accounts = sorted_members(s.chain);
         }
 
-        // Flatten and sort by risk_score descending
+        // Flatten, scoring every ring in the same pass (risk = max score
+        // among members), then sort by risk_score descending
         std::vector<FraudRing> result;
         result.reserve(ring_map.size());
         for (auto& [_, ring] : ring_map) {
+            ring.risk_score = max_member_score(scores, ring.member_accounts);
             result.push_back(std::move(ring));
         }
-        std::sort(result.begin(), result.end(),
+        sort_records(result,
             [](const FraudRing& a, const FraudRing& b) {
                 return a.risk_score > b.risk_score;
             });
 
         return result;
     }
+
+private:
+    /**
+     * Score entries above zero, in map order.  Filtering up front lets the
+     * builder size its result exactly instead of growing a vector of
+     * large records one account at a time.
+     */
+    static std::vector<const std::pair<const std::string, double>*> flagged_scores(
+        const std::unordered_map<std::string, double>& scores)
+    {
+        std::vector<const std::pair<const std::string, double>*> flagged;
+        for (const auto& entry : scores) {
+            if (entry.second > 0.0) flagged.push_back(&entry);
+        }
+        return flagged;
+    }
+
+    // Profile fields and graph neighbours of one suspicious account,
+    // given its node id (-1 if it is not in the graph)
+    static void fill_account_data(
+        SuspiciousAccount&                                     sa,
+        int                                                    id,
+        const std::unordered_map<std::string, AccountProfile>& profiles,
+        const TransactionGraph&                                graph,
+        std::vector<int>&                                      connected)
+    {
+        // Profile data
+        auto profi = profiles.find(sa.account_id);
+        if (profi != profiles.end()) {
+            sa.account_type      = profi->second.account_type;
+            sa.total_inflow      = profi->second.total_inflow;
+            sa.total_outflow     = profi->second.total_outflow;
+            sa.transaction_count = profi->second.transaction_count;
+        }
+
+        // Connected accounts (graph neighbours): merge the two CSR
+        // slices as ids, dedupe, then map back to names
+        if (id >= 0) {
+            const auto succ = graph.successor_ids(id);
+            const auto pred = graph.predecessor_ids(id);
+            connected.assign(succ.begin(), succ.end());
+            connected.insert(connected.end(), pred.begin(), pred.end());
+            std::sort(connected.begin(), connected.end());
+            connected.erase(std::unique(connected.begin(), connected.end()),
+                            connected.end());
+            sa.connected_accounts.reserve(connected.size());
+            for (int nb : connected) {
+                if (nb != id) sa.connected_accounts.push_back(graph.node_name(nb));
+            }
+        }
+    }
+
+    // Sort by suspicion_score descending, then alphabetically by account_id
+    static void sort_by_score(std::vector<SuspiciousAccount>& accounts) {
+        sort_records(accounts,
+            [](const SuspiciousAccount& a, const SuspiciousAccount& b) {
+                if (a.suspicion_score != b.suspicion_score)
+                    return a.suspicion_score > b.suspicion_score;
+                return a.account_id < b.account_id;
+            });
+    }
+
+    /**
+     * std::sort over an index permutation, then one move per record into
+     * place.  The comparisons (and so the order of ties) are exactly those
+     * of sorting the records directly, but the sort itself shuffles ints
+     * instead of ~200-byte records.
+     */
+    template <typename T, typename Less>
+    static void sort_records(std::vector<T>& records, Less less) {
+        std::vector<size_t> order(records.size());
+        for (size_t i = 0; i < order.size(); ++i) order[i] = i;
+        std::sort(order.begin(), order.end(),
+            [&](size_t a, size_t b) { return less(records[a], records[b]); });
+
+        std::vector<T> sorted;
+        sorted.reserve(records.size());
+        for (const size_t i : order) sorted.push_back(std::move(records[i]));
+        records = std::move(sorted);
+    }
+
+    // Ring members in sorted order without duplicates (one vector, no tree)
+    static std::vector<std::string> sorted_members(const std::vector<std::string>& nodes) {
+        std::vector<std::string> members(nodes);
+        std::sort(members.begin(), members.end());
+        members.erase(std::unique(members.begin(), members.end()), members.end());
+        return members;
+    }
+
+    // Highest score among ring members (0 when none is scored)
+    static double max_member_score(
+        const std::unordered_map<std::string, double>& scores,
+        const std::vector<std::string>&                members)
+    {
+        double max_score = 0.0;
+        for (const auto& acct : members) {
+            auto it = scores.find(acct);
+            if (it != scores.end())
+                max_score = std::max(max_score, it->second);
+        }
+        return max_score;
+    }
 };
 
 } // namespace mm
@@ -4,7 +4,11 @@
 //
 // Finds chains of 3+ hops where intermediate accounts have very low
 // activity (<=3 total transactions), indicating pass-through behaviour.
-// Uses BFS path enumeration.  Mirrors Python shell_detector.py.
+// Uses bidirectional (meet-in-the-middle) path enumeration restricted to
+// shell candidates: b^L search becomes ~2·b^(L/2).  Forward extension is
+// pruned by a precomputed reverse-BFS distance to the nearest sink.  The
+// search runs on the graph's dense integer node ids.
+// Mirrors Python shell_detector.py.
 // ============================================================================
 
 #include "graph_engine.h"
@@ -12,10 +16,12 @@
 
 #include <algorithm>
 #include <cmath>
+#include <limits>
+#include <optional>
 #include <queue>
+#include <set>
+#include <span>
 #include <string>
-#include <unordered_map>
-#include <unordered_set>
 #include <vector>
 
 namespace mm {
@@ -37,99 +43,194 @@ public:
         int min_chain_length      = DEFAULT_MIN_CHAIN_LENGTH,
         int max_chain_length      = DEFAULT_MAX_CHAIN_LENGTH)
     {
-        // Pre-compute node transaction counts
-        std::unordered_map<std::string, int> txn_counts;
-        for (const auto& [id, attr] : graph.all_nodes()) {
-            txn_counts[id] = attr.transaction_count;
-        }
-
-        // Identify shell candidates (low-activity nodes with > 0 txns)
-        std::unordered_set<std::string> shell_candidates;
-        for (const auto& [id, cnt] : txn_counts) {
-            if (cnt > 0 && cnt <= max_intermediate_txns) {
-                shell_candidates.insert(id);
+        // Node ids are dense ints (graph.node_id); names are only looked up
+        // again when an accepted chain is turned into a ShellResult.
+        const int n = (int)graph.node_count();
+
+        // Identify shell candidates: low-activity nodes (> 0 txns) that pass
+        // funds through (inflow/outflow ratio >= 0.5).  Pass-through is a
+        // per-node property, so it is decided once here; the search never
+        // visits a node that would later fail chain validation.
+        std::vector<char> is_shell(n, 0);
+        bool any_shell = false;
+        for (int id = 0; id < n; ++id) {
+            const auto& attr = graph.node(graph.node_name(id));
+            const int cnt = attr.transaction_count;
+            if (cnt > 0 && cnt <= max_intermediate_txns && is_passthrough(attr)) {
+                is_shell[id] = 1;
+                any_shell    = true;
             }
         }
 
-        if (shell_candidates.empty()) return {};
+        if (!any_shell) return {};
 
         // Find sources and sinks
-        std::vector<std::string> sources, sinks;
-        for (const auto& [id, _] : graph.all_nodes()) {
-            int in_d  = graph.in_degree(id);
-            int out_d = graph.out_degree(id);
+        std::vector<int> sources, sinks;
+        for (int id = 0; id < n; ++id) {
+            const int in_d  = (int)graph.predecessor_ids(id).size();
+            const int out_d = (int)graph.successor_ids(id).size();
             if (in_d == 0 || out_d > in_d) sources.push_back(id);
             if (out_d == 0 || in_d > out_d) sinks.push_back(id);
         }
 
         // Fallback
         if (sources.empty()) {
-            for (const auto& [id, _] : graph.all_nodes()) sources.push_back(id);
+            for (int id = 0; id < n; ++id) sources.push_back(id);
         }
         if (sinks.empty()) {
-            for (const auto& [id, _] : graph.all_nodes()) sinks.push_back(id);
+            for (int id = 0; id < n; ++id) sinks.push_back(id);
         }
 
-        // Convert sinks to set for O(1) lookup
-        std::unordered_set<std::string> sink_set(sinks.begin(), sinks.end());
+        // ── Meet-in-the-middle split ────────────────────────────────────
+        // A chain of E edges is split at node p_k with k = ceil(E/2): the
+        // forward half (<= ceil(L/2) edges) starts at a source, the backward
+        // half (<= floor(L/2) edges) ends at a sink.  Every chain has exactly
+        // one split point, so each is assembled once, and both halves only
+        // ever walk through shell candidates (every intermediate must be one).
+        const int back_depth = max_chain_length / 2;
+        const int fwd_depth  = max_chain_length - back_depth;
+
+        // Backward half-paths: meet node → suffixes [meet, ..., sink]
+        std::vector<std::vector<std::vector<int>>> suffixes(n);
+        bool any_suffix = false;
+        for (const int sink : sinks) {
+            std::vector<std::vector<int>> stack;
+            stack.push_back({sink});
+
+            while (!stack.empty()) {
+                auto suffix = std::move(stack.back());
+                stack.pop_back();
+                if ((int)suffix.size() - 1 >= back_depth) continue;
+
+                for (const int prev : graph.predecessor_ids(suffix.front())) {
+                    if (!is_shell[prev]) continue;
+                    if (std::find(suffix.begin(), suffix.end(), prev) != suffix.end())
+                        continue;
+
+                    std::vector<int> ext;
+                    ext.reserve(suffix.size() + 1);
+                    ext.push_back(prev);
+                    ext.insert(ext.end(), suffix.begin(), suffix.end());
+                    suffixes[prev].push_back(ext);
+                    any_suffix = true;
+                    stack.push_back(std::move(ext));
+                }
+            }
+        }
+
+        if (!any_suffix) return {};
+
+        // Fewest hops from each shell candidate to any sink (reverse BFS
+        // through shell candidates).  A forward node at depth k whose sink
+        // distance exceeds max_chain_length - k cannot complete a chain.
+        constexpr int UNREACHABLE = std::numeric_limits<int>::max() / 2;
+        std::vector<int> reach_to_sink(n, UNREACHABLE);
+        {
+            std::queue<int> bfs;
+            for (const int sink : sinks) {
+                if (reach_to_sink[sink] == UNREACHABLE) {
+                    reach_to_sink[sink] = 0;
+                    bfs.push(sink);
+                }
+            }
+            while (!bfs.empty()) {
+                const int v = bfs.front();
+                bfs.pop();
+                const int d = reach_to_sink[v];
+                if (d >= max_chain_length) continue;
+                for (const int prev : graph.predecessor_ids(v)) {
+                    if (!is_shell[prev] || reach_to_sink[prev] != UNREACHABLE) continue;
+                    reach_to_sink[prev] = d + 1;
+                    bfs.push(prev);
+                }
+            }
+        }
 
         std::vector<ShellResult> results;
-        std::unordered_set<std::string> seen_chains;
+        std::set<std::vector<int>> seen_chains;
         int ring_counter = 0;
 
-        for (const auto& source : sources) {
-            if (ring_counter >= MAX_PATHS) break;
+        // Forward half-paths from each source through shell candidates.
+        // One path is extended/backtracked in place; membership is a flag
+        // per node id instead of a hash probe.
+        using SuccIt = std::span<const int>::iterator;
+        struct Cursor { SuccIt it, end; };
 
-            // BFS for paths from source through shell candidates to sinks
-            // Stack: {node, path}
-            struct Frame {
-                std::string              node;
-                std::vector<std::string> path;
-            };
+        std::vector<char> in_path(n, 0);
+        std::vector<int>  path;
+        std::vector<Cursor> cursors;
 
-            std::vector<Frame> stack;
-            stack.push_back({source, {source}});
+        for (const int source : sources) {
+            if (ring_counter >= MAX_PATHS) break;
 
-            int paths_from_source = 0;
+            path.assign(1, source);
+            in_path[source] = 1;
+            cursors.clear();
+            {
+                const auto succ = graph.successor_ids(source);
+                cursors.push_back({succ.begin(), succ.end()});
+            }
 
-            while (!stack.empty() && ring_counter < MAX_PATHS) {
-                auto [curr, path] = std::move(stack.back());
-                stack.pop_back();
+            int paths_from_source = 0;
 
-                if ((int)path.size() > max_chain_length + 1) continue;
+            while (!cursors.empty() && ring_counter < MAX_PATHS) {
                 if (paths_from_source > 20) break; // safety cap per source
 
-                for (const auto& next : graph.successors(curr)) {
-                    // Check if already in path (simple path)
-                    bool in_path = false;
-                    for (const auto& p : path) {
-                        if (p == next) { in_path = true; break; }
-                    }
-                    if (in_path) continue;
-
-                    auto new_path = path;
-                    new_path.push_back(next);
-
-                    int edges = (int)new_path.size() - 1;
-
-                    // Check if this forms a valid shell chain to a sink
-                    if (edges >= min_chain_length && sink_set.count(next)) {
-                        auto chain_result = validate_shell_chain(
-                            graph, new_path, shell_candidates,
-                            seen_chains, ring_counter);
-                        if (chain_result.has_value()) {
-                            results.push_back(std::move(*chain_result));
-                            ++paths_from_source;
-                            if (ring_counter >= MAX_PATHS) break;
-                        }
-                    }
+                auto& cur = cursors.back();
+                if (cur.it == cur.end) {
+                    cursors.pop_back();
+                    in_path[path.back()] = 0;
+                    path.pop_back();
+                    continue;
+                }
 
-                    // Continue exploring if not too long
-                    if (edges < max_chain_length) {
-                        stack.push_back({next, std::move(new_path)});
+                const int next = *cur.it++;
+                if (!is_shell[next] || in_path[next]) continue;
+                if ((int)path.size() + reach_to_sink[next] > max_chain_length) continue;
+
+                path.push_back(next);
+                in_path[next] = 1;
+                const int k = (int)path.size() - 1;
+
+                // Join with backward halves meeting at `next`
+                for (const auto& suffix : suffixes[next]) {
+                    const int j = (int)suffix.size() - 1;
+                    if (j != k && j != k - 1) continue;  // not this chain's split
+                    const int edges = k + j;
+                    if (edges < min_chain_length) continue;
+
+                    bool overlap = false;
+                    for (size_t i = 1; i < suffix.size() && !overlap; ++i)
+                        overlap = in_path[suffix[i]] != 0;
+                    if (overlap) continue;
+
+                    std::vector<int> chain;
+                    chain.reserve(path.size() + suffix.size() - 1);
+                    chain.insert(chain.end(), path.begin(), path.end());
+                    chain.insert(chain.end(), suffix.begin() + 1, suffix.end());
+
+                    auto chain_result = validate_shell_chain(
+                        graph, std::move(chain), is_shell,
+                        seen_chains, ring_counter);
+                    if (chain_result.has_value()) {
+                        results.push_back(std::move(*chain_result));
+                        ++paths_from_source;
+                        if (ring_counter >= MAX_PATHS) break;
                     }
                 }
+
+                // Continue the forward half if within its depth budget
+                if (k < fwd_depth) {
+                    const auto succ = graph.successor_ids(next);
+                    cursors.push_back({succ.begin(), succ.end()});
+                } else {
+                    in_path[next] = 0;
+                    path.pop_back();
+                }
             }
+
+            // Clear membership flags left by an early break
+            for (const int id : path) in_path[id] = 0;
         }
 
         return results;
@@ -138,74 +239,58 @@ public:
 private:
     static std::optional<ShellResult> validate_shell_chain(
         const TransactionGraph& graph,
-        const std::vector<std::string>& path,
-        const std::unordered_set<std::string>& shell_candidates,
-        std::unordered_set<std::string>& seen_chains,
+        std::vector<int> path,
+        const std::vector<char>& is_shell,
+        std::set<std::vector<int>>& seen_chains,
         int& ring_counter)
     {
-        // Extract intermediates (exclude first and last)
-        std::vector<std::string> intermediates(path.begin() + 1, path.end() - 1);
-        if (intermediates.empty()) return std::nullopt;
+        // Intermediates exclude first and last
+        if (path.size() < 3) return std::nullopt;
 
-        // All intermediates must be shell candidates
-        for (const auto& n : intermediates) {
-            if (!shell_candidates.count(n)) return std::nullopt;
-        }
-
-        // Build chain key for deduplication
-        std::string chain_key;
-        for (const auto& n : path) {
-            if (!chain_key.empty()) chain_key += "→";
-            chain_key += n;
-        }
-        if (!seen_chains.insert(chain_key).second) return std::nullopt;
-
-        // Verify pass-through: inflow ≈ outflow for intermediates
-        for (const auto& inode : intermediates) {
-            const auto& attr = graph.node(inode);
-            double inflow  = attr.total_inflow;
-            double outflow = attr.total_outflow;
-            if (inflow > 0 && outflow > 0) {
-                double ratio = std::min(inflow, outflow) / std::max(inflow, outflow);
-                if (ratio < 0.5) return std::nullopt;
-            } else {
-                return std::nullopt;
-            }
+        // All intermediates must be shell (low-activity, pass-through) candidates
+        for (size_t i = 1; i + 1 < path.size(); ++i) {
+            if (!is_shell[path[i]]) return std::nullopt;
         }
 
         // Calculate total amount through chain
         double total_amount = chain_amount(graph, path);
 
+        // Deduplicate on the id sequence
+        auto [it, inserted] = seen_chains.insert(std::move(path));
+        if (!inserted) return std::nullopt;
+        const std::vector<int>& ids = *it;
+
         ++ring_counter;
 
         ShellResult sr;
-        sr.ring_id               = "RING_" + pad3(ring_counter);
-        sr.pattern_type          = "shell";
-        sr.chain                 = path;
-        sr.intermediate_accounts = intermediates;
+        sr.ring_id               = format_ring_id(ring_counter);
+        sr.chain.reserve(ids.size());
+        for (const int id : ids) sr.chain.push_back(graph.node_name(id));
+        sr.intermediate_accounts.assign(sr.chain.begin() + 1, sr.chain.end() - 1);
         sr.total_amount          = std::round(total_amount * 100.0) / 100.0;
-        sr.shell_depth           = (int)intermediates.size();
+        sr.shell_depth           = (int)sr.intermediate_accounts.size();
         sr.risk_score            = 0.0; // Calculated later by scoring engine
         return sr;
     }
 
+    // Pass-through: inflow ≈ outflow (min/max ratio >= 0.5)
+    static bool is_passthrough(const NodeAttr& attr) {
+        const double inflow  = attr.total_inflow;
+        const double outflow = attr.total_outflow;
+        if (inflow <= 0 || outflow <= 0) return false;
+        return std::min(inflow, outflow) / std::max(inflow, outflow) >= 0.5;
+    }
+
+    // O(L): sums the per-edge totals aggregated once at graph build time
     static double chain_amount(const TransactionGraph& graph,
-                                const std::vector<std::string>& path) {
+                                const std::vector<int>& path) {
         double total = 0.0;
         for (size_t i = 0; i + 1 < path.size(); ++i) {
-            const auto& txns = graph.edge_transactions(path[i], path[i + 1]);
-            for (const auto& [amt, _] : txns) {
-                total += amt;
-            }
+            const AggEdge* edge = graph.find_agg_edge(path[i], path[i + 1]);
+            if (edge) total += edge->total_amount;
         }
         return total;
     }
-
-    static std::string pad3(int n) {
-        char buf[8];
-        snprintf(buf, sizeof(buf), "%03d", n);
-        return std::string(buf);
-    }
 };
 
 } // namespace mm
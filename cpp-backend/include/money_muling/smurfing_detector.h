@@ -6,21 +6,23 @@
 // Fan-out: sender with >=10 unique receivers within a configured window.
 //
 // Performance optimisations:
-//   • Uses RedBlackTree for O(log n) time-range queries per account
-//   • Pre-groups transaction indices by account using unordered_map
-//   • Inner sliding window uses a deque + hash set for O(1) amortised ops
+//   • Account codes are the graph's dense node ids (factorized once in
+//     TransactionGraph::build); grouping and the counterparty counter are
+//     plain vectors indexed by code, and no string is hashed here
+//   • Inner sliding window (fan_scan) is a hash-free two-pointer kernel
+//     over contiguous columns, O(1) amortised per step
 //   • Sorts once globally, reuses sorted order for all accounts
 // ============================================================================
 
+#include "csv_parser.h"
+#include "graph_engine.h"
 #include "models.h"
-#include "red_black_tree.h"
 
 #include <algorithm>
 #include <chrono>
-#include <deque>
+#include <cstdint>
 #include <string>
-#include <unordered_map>
-#include <unordered_set>
+#include <string_view>
 #include <vector>
 
 namespace mm {
@@ -35,10 +37,12 @@ public:
      *
      * Uses a globally-sorted index + per-account sliding window for
      * O(N log N) overall complexity (vs original O(N²) per account window).
-     * RedBlackTree provides the sorted timestamp index.
+     * `graph` must have been built from `txns`; its row-aligned node ids
+     * are used as the account codes.
      */
     static std::vector<SmurfingResult> detect(
         const std::vector<Transaction>& txns,
+        const TransactionGraph&         graph,
         int    fan_threshold = DEFAULT_FAN_THRESHOLD,
         double window_hours  = DEFAULT_WINDOW_HRS)
     {
@@ -46,137 +50,188 @@ public:
 
         std::vector<SmurfingResult> results;
 
-        // Build RBT over all transactions (sorted by timestamp)
-        RedBlackTree rbt;
-        for (const auto& t : txns)
-            rbt.insert(t);
-
-        // Get all transactions in timestamp order via RBT in-order traversal
-        auto sorted_ptrs = rbt.all();  // O(N), already sorted
-
-        // Build sorted index array (indices into txns)
-        std::vector<size_t> sorted_idx;
-        sorted_idx.reserve(sorted_ptrs.size());
-        // Map pointer back to index (needed for fan detection referencing txns[])
-        std::unordered_map<const Transaction*, size_t> ptr_to_idx;
-        ptr_to_idx.reserve(txns.size());
-        for (size_t i = 0; i < txns.size(); ++i)
-            ptr_to_idx[&txns[i]] = i;
-
-        for (const auto* p : sorted_ptrs)
-            sorted_idx.push_back(ptr_to_idx[p]);
+        // Row indices in timestamp order (stable, so ties keep file order)
+        std::vector<int> order(txns.size());
+        for (int i = 0; i < (int)txns.size(); ++i) order[i] = i;
+        std::stable_sort(order.begin(), order.end(),
+            [&](int a, int b) { return txns[a].timestamp < txns[b].timestamp; });
 
         auto window_dur = std::chrono::duration_cast<std::chrono::system_clock::duration>(
             std::chrono::duration<double, std::ratio<3600>>(window_hours));
 
+        // Reuse the graph's account factorization: the codes are node ids,
+        // gathered into the time-sorted order once for both passes
+        const auto sender_ids   = graph.sender_ids();
+        const auto receiver_ids = graph.receiver_ids();
+
+        std::vector<const Transaction*> sorted_ptrs;
+        AccountCodes codes;
+        sorted_ptrs.reserve(order.size());
+        codes.sender.reserve(order.size());
+        codes.receiver.reserve(order.size());
+        codes.ticks.reserve(order.size());
+        codes.names.reserve(graph.node_count());
+        for (int id = 0; id < (int)graph.node_count(); ++id)
+            codes.names.push_back(graph.node_name(id));
+
+        std::vector<char> seen(graph.node_count(), 0);
+        auto note_seen = [&](int id) {
+            if (!seen[id]) { seen[id] = 1; codes.visit_order.push_back(id); }
+        };
+        for (const int row : order) {
+            sorted_ptrs.push_back(&txns[row]);
+            codes.sender.push_back(sender_ids[row]);
+            codes.receiver.push_back(receiver_ids[row]);
+            codes.ticks.push_back(txns[row].timestamp.time_since_epoch().count());
+            note_seen(sender_ids[row]);
+            note_seen(receiver_ids[row]);
+        }
+
         // Fan-in:  group by receiver, sliding window over counterparty senders
-        detect_fan_opt(txns, sorted_idx, results, fan_threshold, window_dur, false);
+        detect_fan_opt(sorted_ptrs, codes, results, fan_threshold, window_dur, false);
 
         // Fan-out: group by sender, sliding window over counterparty receivers
-        detect_fan_opt(txns, sorted_idx, results, fan_threshold, window_dur, true);
+        detect_fan_opt(sorted_ptrs, codes, results, fan_threshold, window_dur, true);
 
         return results;
     }
 
 private:
+    // Dense account codes and raw clock ticks, parallel to the time-sorted
+    // transaction order
+    struct AccountCodes {
+        std::vector<std::string_view> names;     // code → account id
+        std::vector<int>              sender;
+        std::vector<int>              receiver;
+        std::vector<int64_t>          ticks;     // system_clock ticks
+        std::vector<int>              visit_order;  // codes by first appearance in time
+    };
+
+    struct FanScan {
+        int    best_unique = 0;
+        int    best_left   = 0;
+        int    best_right  = 0;
+        double best_total  = 0.0;
+    };
+
+    /**
+     * Two-pointer window kernel over one account's columns.
+     *
+     * Pure arithmetic on flat arrays: cp_count is a dense scratch counter
+     * indexed by counterparty code, returned to all-zero before exit so it
+     * can be reused for every account.  cum_amounts is the prefix sum of
+     * the account's amounts (size n + 1), so a window total is one
+     * subtraction and only computed when a new best window is recorded.
+     */
+    static FanScan fan_scan(const std::vector<int64_t>& ts,
+                            const std::vector<int>&     cps,
+                            const std::vector<double>&  cum_amounts,
+                            int64_t                     window_ticks,
+                            std::vector<int>&           cp_count)
+    {
+        const int n = (int)ts.size();
+        FanScan best;
+        int unique_in_window = 0;
+
+        int left = 0;
+        for (int right = 0; right < n; ++right) {
+            // Add right element
+            if (cp_count[cps[right]]++ == 0) ++unique_in_window;
+
+            // Shrink left so window fits
+            while (left < right && ts[right] - ts[left] > window_ticks) {
+                if (--cp_count[cps[left]] == 0) --unique_in_window;
+                ++left;
+            }
+
+            if (unique_in_window > best.best_unique) {
+                best.best_unique = unique_in_window;
+                best.best_left   = left;
+                best.best_right  = right;
+                best.best_total  = cum_amounts[right + 1] - cum_amounts[left];
+            }
+        }
+
+        for (int i = left; i < n; ++i) cp_count[cps[i]] = 0;
+        return best;
+    }
+
     /**
      * Optimised fan detection using a proper O(N) per-account sliding window.
      *
      * Key: instead of rebuilding the counterparty set on every right-pointer
-     * move (O(window_size)), we maintain a count map.  Adding/removing a
+     * move (O(window_size)), we maintain a count array.  Adding/removing a
      * counterparty is O(1).  Total complexity per account = O(txns_for_account).
+     * Each account's timestamps (raw ticks), amount prefix sums and
+     * counterparty codes are first copied into contiguous columns for
+     * fan_scan().
      */
     static void detect_fan_opt(
-        const std::vector<Transaction>& txns,
-        const std::vector<size_t>&      sorted_idx,
-        std::vector<SmurfingResult>&    results,
-        int                             threshold,
-        std::chrono::system_clock::duration window,
-        bool                            group_by_sender)
+        const std::vector<const Transaction*>& sorted,
+        const AccountCodes&                    codes,
+        std::vector<SmurfingResult>&           results,
+        int                                    threshold,
+        std::chrono::system_clock::duration    window,
+        bool                                   group_by_sender)
     {
-        // Group indices by account (in sorted order → already sorted per account)
-        std::unordered_map<std::string, std::vector<size_t>> groups;
-        groups.reserve(256);
-        for (auto idx : sorted_idx) {
-            const auto& key = group_by_sender ? txns[idx].sender : txns[idx].receiver;
-            groups[key].push_back(idx);
+        const auto& key_code = group_by_sender ? codes.sender : codes.receiver;
+        const auto& cp_code  = group_by_sender ? codes.receiver : codes.sender;
+
+        // Group positions by account code (in sorted order → already sorted
+        // per account)
+        std::vector<std::vector<int>> groups(codes.names.size());
+        for (int k = 0; k < (int)sorted.size(); ++k) {
+            groups[key_code[k]].push_back(k);
         }
 
-        for (const auto& [acct, indices] : groups) {
-            const int n = (int)indices.size();
-            if (n < threshold) continue;
-
-            // Sliding window with counterparty frequency map
-            // Allows O(1) unique-count maintenance
-            std::unordered_map<std::string, int> cp_count;
-            cp_count.reserve(threshold * 2);
-            int unique_in_window = 0;
-            double total_in_window = 0.0;
-
-            int best_unique = 0;
-            TimePoint best_start{};
-            TimePoint best_end{};
-            double best_total = 0.0;
-
-            int left = 0;
-            for (int right = 0; right < n; ++right) {
-                // Add right element
-                const auto& rt = txns[indices[right]];
-                const auto& rcp = group_by_sender ? rt.receiver : rt.sender;
-                int& cnt = cp_count[rcp];
-                if (cnt == 0) ++unique_in_window;
-                ++cnt;
-                total_in_window += rt.amount;
-
-                // Shrink left so window fits
-                while (left < right &&
-                       (rt.timestamp - txns[indices[left]].timestamp) > window) {
-                    const auto& lt  = txns[indices[left]];
-                    const auto& lcp = group_by_sender ? lt.receiver : lt.sender;
-                    int& lc = cp_count[lcp];
-                    --lc;
-                    if (lc == 0) --unique_in_window;
-                    total_in_window -= lt.amount;
-                    ++left;
-                }
-
-                if (unique_in_window > best_unique) {
-                    best_unique = unique_in_window;
-                    best_start  = txns[indices[left]].timestamp;
-                    best_end    = rt.timestamp;
-                    best_total  = total_in_window;
-                }
+        const int64_t window_ticks = window.count();
+        std::vector<int> cp_count(codes.names.size(), 0);
+
+        // Per-account columns (contiguous, reused across accounts)
+        std::vector<int64_t> ts;
+        std::vector<double>  cum_amounts;  // prefix sums, cum[0] = 0
+        std::vector<int>     cps;
+
+        // Accounts in order of first appearance, so results (and the ring
+        // ids numbered from them) follow the transaction timeline
+        for (const int acct : codes.visit_order) {
+            const auto& group = groups[acct];
+            if ((int)group.size() < threshold) continue;
+
+            ts.clear();
+            cum_amounts.assign(1, 0.0);
+            cps.clear();
+            for (int k : group) {
+                ts.push_back(codes.ticks[k]);
+                cum_amounts.push_back(cum_amounts.back() + sorted[k]->amount);
+                cps.push_back(cp_code[k]);
             }
 
-            if (best_unique >= threshold) {
+            const FanScan best = fan_scan(ts, cps, cum_amounts, window_ticks, cp_count);
+
+            if (best.best_unique >= threshold) {
                 using namespace std::chrono;
+                const int64_t best_start = ts[best.best_left];
+                const int64_t best_end   = ts[best.best_right];
                 double hours_span = std::max(
-                    duration_cast<duration<double, std::ratio<3600>>>(best_end - best_start).count(),
+                    duration_cast<duration<double, std::ratio<3600>>>(
+                        system_clock::duration(best_end - best_start)).count(),
                     1.0);
 
                 SmurfingResult sr;
-                sr.account_id            = acct;
+                sr.account_id            = std::string(codes.names[acct]);
                 sr.pattern_type          = group_by_sender ? "fan_out" : "fan_in";
-                sr.unique_counterparties  = best_unique;
-                sr.total_amount          = std::round(best_total * 100.0) / 100.0;
-                sr.velocity_per_hour     = std::round((best_total / hours_span) * 100.0) / 100.0;
-                sr.window_start          = timepoint_to_iso(best_start);
-                sr.window_end            = timepoint_to_iso(best_end);
+                sr.unique_counterparties  = best.best_unique;
+                sr.total_amount          = std::round(best.best_total * 100.0) / 100.0;
+                sr.velocity_per_hour     = std::round((best.best_total / hours_span) * 100.0) / 100.0;
+                sr.window_start          = timepoint_to_iso(TimePoint(system_clock::duration(best_start)));
+                sr.window_end            = timepoint_to_iso(TimePoint(system_clock::duration(best_end)));
                 // ring_id generated later in pipeline; use account as placeholder
-                sr.ring_id               = "SMURF_" + acct.substr(0, std::min((int)acct.size(), 8));
+                sr.ring_id               = "SMURF_" + sr.account_id.substr(0, std::min((int)sr.account_id.size(), 8));
                 results.push_back(std::move(sr));
             }
         }
     }
-
-    static std::string timepoint_to_iso(TimePoint tp) {
-        auto t = std::chrono::system_clock::to_time_t(tp);
-        std::tm tm{};
-        gmtime_r(&t, &tm);
-        char buf[32];
-        strftime(buf, sizeof(buf), "%Y-%m-%dT%H:%M:%S", &tm);
-        return std::string(buf);
-    }
 };
 
 } // namespace mm
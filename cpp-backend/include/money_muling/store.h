@@ -5,13 +5,27 @@
 // Thread-safe storage for analysis results.  When ENABLE_REDIS is defined
 // and Redis is reachable, results are also persisted to Redis so they
 // survive process restarts.
+//
+// Results are held as immutable shared_ptr snapshots: readers take a
+// reference under the lock instead of deep-copying the result, so polling
+// and downloads never serialise behind each other or a finishing analysis.
+//
+// The in-memory map is a bounded LRU (MAX_RESULTS entries): storing a new
+// analysis evicts the least recently stored/read one, so a long-running
+// server's memory stays flat.  Evicted snapshots stay alive for readers
+// that still hold them.
+//
+// Completed results also keep their graph JSON serialised once at put()
+// time, so /graph polls hand out the cached body instead of re-encoding
+// tens of thousands of nodes and edges per request.
 // ============================================================================
 
 #include "models.h"
 #include "json_serializer.h"
 
+#include <list>
+#include <memory>
 #include <mutex>
-#include <optional>
 #include <string>
 #include <unordered_map>
 
@@ -24,6 +38,11 @@ namespace mm {
 
 class Store {
 public:
+    using ResultPtr = std::shared_ptr<const AnalysisResult>;
+    using JsonPtr   = std::shared_ptr<const std::string>;
+
+    // Analyses kept in memory before the least recently used is evicted
+    static constexpr size_t MAX_RESULTS = 256;
 
     // Singleton access
     static Store& instance() {
@@ -33,11 +52,39 @@ public:
 
     // Store a result (thread-safe)
     void put(const std::string& id, AnalysisResult result) {
-        std::lock_guard<std::mutex> lock(mtx_);
-        results_[id] = std::move(result);
+        auto snapshot = std::make_shared<const AnalysisResult>(std::move(result));
+        JsonPtr graph_body;
+        if (snapshot->status == AnalysisStatus::COMPLETED) {
+            graph_body = std::make_shared<const std::string>(
+                graph_data_to_json(snapshot->graph_data).dump());
+        }
+
+        ResultPtr previous;  // released after the lock is dropped
+        ResultPtr evicted;   // likewise
+        {
+            std::lock_guard<std::mutex> lock(mtx_);
+            auto [it, inserted] = results_.try_emplace(id);
+            auto& entry = it->second;
+            if (inserted) {
+                lru_.push_front(id);
+                entry.lru_pos = lru_.begin();
+            } else {
+                touch(entry);
+            }
+            previous         = std::move(entry.result);
+            entry.result     = snapshot;
+            entry.graph_json = std::move(graph_body);
+
+            if (results_.size() > MAX_RESULTS) {
+                auto victim = results_.find(lru_.back());
+                evicted = std::move(victim->second.result);
+                results_.erase(victim);
+                lru_.pop_back();
+            }
+        }
 
 #ifdef ENABLE_REDIS
-        persist_to_redis(id);
+        persist_to_redis(id, *snapshot);
 #endif
     }
 
@@ -45,28 +92,41 @@ public:
     void update_status(const std::string& id, AnalysisStatus status) {
         std::lock_guard<std::mutex> lock(mtx_);
         auto it = results_.find(id);
-        if (it != results_.end()) {
-            it->second.status = status;
+        if (it != results_.end() && it->second.result) {
+            // Copy-on-write; only ever applied to small PENDING stubs
+            auto updated = std::make_shared<AnalysisResult>(*it->second.result);
+            updated->status = status;
+            it->second.result = std::move(updated);
         }
     }
 
-    // Retrieve a result (thread-safe)
-    std::optional<AnalysisResult> get(const std::string& id) {
+    // Retrieve a result snapshot, or nullptr (thread-safe)
+    ResultPtr get(const std::string& id) {
         std::lock_guard<std::mutex> lock(mtx_);
         auto it = results_.find(id);
         if (it != results_.end()) {
-            return it->second;
+            touch(it->second);
+            return it->second.result;
         }
 
 #ifdef ENABLE_REDIS
         // Try loading from Redis
         if (load_from_redis(id)) {
             auto it2 = results_.find(id);
-            if (it2 != results_.end()) return it2->second;
+            if (it2 != results_.end()) return it2->second.result;
         }
 #endif
 
-        return std::nullopt;
+        return nullptr;
+    }
+
+    // Serialised graph_data of a completed result, or nullptr (thread-safe)
+    JsonPtr graph_json(const std::string& id) {
+        std::lock_guard<std::mutex> lock(mtx_);
+        auto it = results_.find(id);
+        if (it == results_.end()) return nullptr;
+        touch(it->second);
+        return it->second.graph_json;
     }
 
     // Check existence
@@ -98,8 +158,20 @@ private:
     Store(const Store&) = delete;
     Store& operator=(const Store&) = delete;
 
+    struct Entry {
+        ResultPtr                        result;
+        JsonPtr                          graph_json;  // set for completed results
+        std::list<std::string>::iterator lru_pos;     // position in lru_
+    };
+
     std::mutex mtx_;
-    std::unordered_map<std::string, AnalysisResult> results_;
+    std::unordered_map<std::string, Entry> results_;
+    std::list<std::string>                 lru_;  // most recently used first
+
+    // Mark an entry most recently used (caller holds mtx_)
+    void touch(Entry& entry) {
+        lru_.splice(lru_.begin(), lru_, entry.lru_pos);
+    }
 
 #ifdef ENABLE_REDIS
     std::string redis_host_ = "127.0.0.1";
@@ -119,14 +191,11 @@ private:
         return ctx;
     }
 
-    void persist_to_redis(const std::string& id) {
+    void persist_to_redis(const std::string& id, const AnalysisResult& result) {
         auto ctx = connect_redis();
         if (!ctx) return;
 
-        auto it = results_.find(id);
-        if (it == results_.end()) { redisFree(ctx); return; }
-
-        json j       = analysis_result_to_json(it->second);
+        json j       = analysis_result_to_json(result);
         std::string s = j.dump();
 
         redisReply* reply = (redisReply*)redisCommand(
@@ -207,7 +207,7 @@ int main() {
     CROW_ROUTE(app, "/api/v1/analysis/<string>")
     ([](const std::string& analysis_id) {
         auto result = mm::Store::instance().get(analysis_id);
-        if (!result.has_value()) {
+        if (!result) {
             json err = {{"detail", "Analysis not found"}};
             crow::response res(404);
             res.set_header("Content-Type", "application/json");
@@ -215,7 +215,7 @@ int main() {
             return res;
         }
 
-        json j = mm::analysis_result_to_json(result.value());
+        json j = mm::analysis_result_to_json(*result);
         crow::response res(200);
         res.set_header("Content-Type", "application/json");
         res.body = j.dump();
@@ -226,7 +226,7 @@ int main() {
     CROW_ROUTE(app, "/api/v1/analysis/<string>/download")
     ([](const std::string& analysis_id) {
         auto result = mm::Store::instance().get(analysis_id);
-        if (!result.has_value()) {
+        if (!result) {
             json err = {{"detail", "Analysis not found"}};
             crow::response res(404);
             res.set_header("Content-Type", "application/json");
@@ -242,7 +242,7 @@ int main() {
             return res;
         }
 
-        json j = mm::download_result_to_json(result.value());
+        json j = mm::download_result_to_json(*result);
         crow::response res(200);
         res.set_header("Content-Type", "application/json");
         res.set_header("Content-Disposition",
@@ -255,7 +255,7 @@ int main() {
     CROW_ROUTE(app, "/api/v1/analysis/<string>/graph")
     ([](const std::string& analysis_id) {
         auto result = mm::Store::instance().get(analysis_id);
-        if (!result.has_value()) {
+        if (!result) {
             json err = {{"detail", "Analysis not found"}};
             crow::response res(404);
             res.set_header("Content-Type", "application/json");
@@ -271,10 +271,15 @@ int main() {
             return res;
         }
 
-        json j = mm::graph_data_to_json(result->graph_data);
+        // Serialised once when the analysis completed; re-encode only if
+        // the entry was replaced in between
         crow::response res(200);
         res.set_header("Content-Type", "application/json");
-        res.body = j.dump();
+        if (auto body = mm::Store::instance().graph_json(analysis_id)) {
+            res.body = *body;
+        } else {
+            res.body = mm::graph_data_to_json(result->graph_data).dump();
+        }
         return res;
     });
 